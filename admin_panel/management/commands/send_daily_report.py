@@ -459,7 +459,8 @@ class Command(BaseCommand):
                 }.get(txn.payment_method, txn.payment_method.title())
                 
                 time_str = timezone.localtime(txn.created_at).strftime('%H:%M:%S')
-                amount = Decimal(str(txn.total_amount)) if txn.total_amount is not None else Decimal('0.00')
+                # total_amount is a DecimalField, already a Decimal
+                amount = txn.total_amount if txn.total_amount is not None else Decimal('0.00')
                 transactions_data.append([
                     txn.transaction_number[:15],
                     member_name,
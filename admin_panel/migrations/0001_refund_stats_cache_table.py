@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-16 12:00
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # Table behind the 'shared' DatabaseCache that holds the dashboard refund
+    # statistics; createcachetable skips tables that already exist.
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,130 @@
+"""
+Refund statistics for the admin dashboard.
+The aggregates are computed periodically by the scheduler and stored in the
+shared (database-backed) cache so dashboard loads only pay for a cache read and
+a refund in any worker process invalidates them everywhere.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Sum, Count, Q, CharField, Exists, OuterRef, Value
+from django.db.models.functions import Concat, TruncDate
+from django.utils import timezone
+
+from members.models import BalanceTransaction
+from transactions.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+REFUND_STATS_CACHE_KEY = 'admin_panel:refund_stats'
+REFUND_STATS_CACHE_ALIAS = 'shared'
+
+
+def refund_stats_cache():
+    """Cache shared by all worker processes (the per-process default would go stale)"""
+    return caches[REFUND_STATS_CACHE_ALIAS]
+
+
+def refund_stats_refresh_minutes():
+    """How often the scheduler recomputes the cached refund statistics"""
+    return getattr(settings, 'DASHBOARD_REFUND_STATS_REFRESH_MINUTES', 5)
+
+
+def refund_queryset():
+    """Transactions that have been refunded"""
+    # Refunds are identified by: status='cancelled' AND notes contains 'Refund'
+    # When a refund is processed, the transaction status is set to 'cancelled' and notes contain 'Refunded'
+    # Also check BalanceTransaction records to catch any refunds that might have different note formats
+    # (e.g. "Refund for transaction TXN-123"); the match is a correlated EXISTS so it stays in SQL.
+    # Like the old transaction\s+([A-Z0-9-]+) pattern, any whitespace may follow "transaction" and
+    # the number must end there, so TXN...1 does not match a note about TXN...12
+    refund_balance_txns = BalanceTransaction.objects.filter(
+        notes__icontains='Refund'
+    ).filter(
+        notes__iregex=Concat(
+            Value(r'transaction\s+'), OuterRef('transaction_number'), Value(r'([^A-Za-z0-9-]|$)'),
+            output_field=CharField(),
+        )
+    )
+
+    # Query for refunds: cancelled transactions with 'Refund' in notes OR transactions with a refund balance record
+    return Transaction.objects.filter(
+        Q(status='cancelled', notes__icontains='Refund') |
+        Q(Exists(refund_balance_txns))
+    )
+
+
+def compute_refund_stats():
+    """Run the refund aggregates against the database"""
+    today = timezone.now().date()
+    two_weeks_ago = today - timedelta(days=13)
+    refund_qs = refund_queryset()
+
+    total_refunds = refund_qs.count()
+    total_refund_amount = refund_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+    today_refunds = refund_qs.filter(updated_at__date=today).count()
+    today_refund_amount = refund_qs.filter(updated_at__date=today).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+
+    # Daily refund trend (14 days)
+    daily_refunds_raw = refund_qs.filter(updated_at__date__gte=two_weeks_ago).annotate(
+        day=TruncDate('updated_at')
+    ).values('day').annotate(
+        total=Sum('total_amount'),
+        count=Count('id')
+    ).order_by('day')
+
+    daily_refunds_map = {entry['day']: {'amount': float(entry['total'] or 0), 'count': entry['count']} for entry in daily_refunds_raw}
+    daily_refund_labels = []
+    daily_refund_amounts = []
+    daily_refund_counts = []
+    for offset in range(14):
+        day = two_weeks_ago + timedelta(days=offset)
+        daily_refund_labels.append(day.strftime('%b %d'))
+        refund_data = daily_refunds_map.get(day, {'amount': 0, 'count': 0})
+        daily_refund_amounts.append(round(refund_data['amount'], 2))
+        daily_refund_counts.append(refund_data['count'])
+
+    # Latest refunds for the dashboard list; cached with the aggregates so a dashboard
+    # load never runs the refund match (a LIKE per transaction row) itself
+    recent_refunds = list(refund_qs.select_related('member').only(
+        'transaction_number', 'total_amount', 'updated_at',
+        'member__first_name', 'member__last_name',
+    ).order_by('-updated_at')[:10])
+
+    return {
+        'recent_refunds': recent_refunds,
+        'total_refunds': total_refunds,
+        'total_refund_amount': total_refund_amount,
+        'today_refunds': today_refunds,
+        'today_refund_amount': today_refund_amount,
+        'daily_refund_labels': json.dumps(daily_refund_labels),
+        'daily_refund_amounts': json.dumps(daily_refund_amounts),
+        'daily_refund_counts': json.dumps(daily_refund_counts),
+    }
+
+
+def refresh_refund_stats():
+    """Recompute the refund statistics and store them in the cache"""
+    stats = compute_refund_stats()
+    # Outlive one refresh interval so a slow job never leaves the dashboard uncached
+    refund_stats_cache().set(REFUND_STATS_CACHE_KEY, stats, timeout=refund_stats_refresh_minutes() * 60 * 2)
+    return stats
+
+
+def get_refund_stats():
+    """Return cached refund statistics, computing them on a cache miss"""
+    stats = refund_stats_cache().get(REFUND_STATS_CACHE_KEY)
+    if stats is None:
+        stats = refresh_refund_stats()
+    return stats
+
+
+def invalidate_refund_stats():
+    """Drop the cached statistics so the next dashboard load sees a new refund"""
+    try:
+        refund_stats_cache().delete(REFUND_STATS_CACHE_KEY)
+    except Exception as e:
+        logger.error(f"Failed to invalidate refund stats: {str(e)}", exc_info=True)
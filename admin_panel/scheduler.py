@@ -6,6 +6,7 @@ import logging
 import sys
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from django.core.management import call_command
 from django.conf import settings
 
@@ -28,6 +29,15 @@ def send_daily_report():
         print(f"Error sending daily report: {str(e)}", file=sys.stderr)
 
 
+def refresh_refund_stats():
+    """Function to recompute the cached dashboard refund statistics"""
+    try:
+        from .refund_stats import refresh_refund_stats as refresh
+        refresh()
+    except Exception as e:
+        logger.error(f"Error refreshing refund stats: {str(e)}", exc_info=True)
+
+
 def start_scheduler():
     """Start the scheduler and add the daily report job"""
     global scheduler
@@ -59,6 +69,17 @@ def start_scheduler():
             max_instances=1,  # Prevent overlapping executions
         )
         
+        # Keep the dashboard refund statistics warm in the cache
+        from .refund_stats import refund_stats_refresh_minutes
+        scheduler.add_job(
+            refresh_refund_stats,
+            trigger=IntervalTrigger(minutes=refund_stats_refresh_minutes()),
+            id='refresh_refund_stats',
+            name='Refresh Dashboard Refund Statistics',
+            replace_existing=True,
+            max_instances=1,
+        )
+        
         # Start the scheduler
         scheduler.start()
         logger.info("Scheduler started successfully. Daily report will run at 12:00 AM every day.")
@@ -1,3 +1,70 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from inventory.models import Product
+from members.models import Member, BalanceTransaction
+from transactions.models import Transaction, TransactionItem
+from .refund_stats import (
+    REFUND_STATS_CACHE_KEY, get_refund_stats, refund_queryset, refund_stats_cache,
+)
+
+
+class RefundTests(TestCase):
+    def setUp(self):
+        refund_stats_cache().clear()
+        self.staff = User.objects.create_user('cashier', password='secret', is_staff=True)
+        self.client.force_login(self.staff)
+        self.product = Product.objects.create(name='Pencil', barcode='PEN001', price=Decimal('10.00'), stock_quantity=5)
+        self.member = Member.objects.create(
+            rfid_card_number='RFID001', first_name='Juan', last_name='Cruz', balance=Decimal('0.00'),
+        )
+
+    def make_sale(self, transaction_number, quantity=2):
+        transaction = Transaction.objects.create(
+            transaction_number=transaction_number, member=self.member, payment_method='debit',
+            status='completed', total_amount=self.product.price * quantity,
+        )
+        TransactionItem.objects.create(
+            transaction=transaction, product=self.product, product_name=self.product.name,
+            product_barcode=self.product.barcode, unit_price=self.product.price, quantity=quantity,
+        )
+        return transaction
+
+    def test_refund_restocks_credits_and_invalidates_stats(self):
+        sale = self.make_sale('TXN202610160000000001')
+        self.assertEqual(get_refund_stats()['total_refunds'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('api_process_refund'),
+                data=json.dumps({'transaction_id': sale.id, 'reason': 'Damaged'}),
+                content_type='application/json',
+            )
+
+        self.assertTrue(response.json()['success'], response.json())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 7)
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.balance, Decimal('20.00'))
+        sale.refresh_from_db()
+        self.assertEqual(sale.status, 'cancelled')
+        self.assertIsNone(refund_stats_cache().get(REFUND_STATS_CACHE_KEY))
+        self.assertEqual(get_refund_stats()['total_refunds'], 1)
+
+    def test_refund_note_matches_only_the_whole_transaction_number(self):
+        refunded = self.make_sale('TXN202610160000000001')
+        other = self.make_sale('TXN2026101600000000012')
+        BalanceTransaction.objects.create(
+            member=self.member, transaction_type='deposit', amount=Decimal('20.00'),
+            balance_before=Decimal('0.00'), balance_after=Decimal('20.00'),
+            notes='Refund for transaction\tTXN202610160000000001 (Original: Debit)',
+        )
+
+        refunds = set(refund_queryset().values_list('pk', flat=True))
 
-# Create your tests here.
+        self.assertIn(refunded.pk, refunds)
+        self.assertNotIn(other.pk, refunds)
@@ -1,13 +1,16 @@
 import json
+import re
 from datetime import timedelta
+from functools import lru_cache
 from decimal import Decimal, InvalidOperation
 
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Avg, Q, F
-from django.db.models.functions import TruncDate
+from django.db.models import Sum, Avg, Q, F, Case, When, Value, IntegerField, Prefetch
+from django.db.models.functions import Concat, TruncDate
 from django.core.paginator import Paginator
+from django.db import transaction as db_transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.urls import reverse
@@ -15,12 +18,27 @@ from django.utils import timezone
 from django.utils.http import urlencode
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 
 from inventory.models import Product, Category
 from members.models import Member, MemberType, BalanceTransaction
 from transactions.models import Transaction, TransactionItem
 
+from .refund_stats import get_refund_stats, invalidate_refund_stats
+
+
+@lru_cache(maxsize=8)
+def quantizer(places):
+    """Decimal exponent for rounding to the given number of decimal places"""
+    return Decimal(1).scaleb(-places)
+
+
+# Currency quantizer shared by receipt formatting helpers
+CENTS = quantizer(2)
+
+# Search input shaped like a scanned RFID card (hex/decimal, at least one digit)
+RFID_QUERY_RE = re.compile(r'(?=.*\d)[0-9A-Fa-f]{6,}')
+
 
 def handle_login(request, redirect_to_dashboard=False):
     """Shared login logic that routes admin and regular users appropriately"""
@@ -86,22 +104,38 @@ def redirect_to_root_login(request):
     return redirect(root_login_url)
 
 
+def _linked_member_role(user):
+    """Role of the active Member linked to a user, or None; cached on the user object"""
+    # request.user is rebuilt for every request, so this caches for one request only
+    if not hasattr(user, '_linked_member_role'):
+        role = None
+        try:
+            member = Member.objects.only('role', 'is_active').get(user=user)
+            if member.is_active:
+                role = member.role
+        except Member.DoesNotExist:
+            pass
+        except Exception:
+            pass
+        user._linked_member_role = role
+    return user._linked_member_role
+
+
 def is_admin_user(user):
     """Check if a user is an admin (staff/superuser or linked to Member with admin role)"""
     if user.is_staff or user.is_superuser:
         return True
     
     # Check if user is linked to a Member with admin role
-    try:
-        member = Member.objects.get(user=user)
-        if member.role == 'admin' and member.is_active:
-            return True
-    except Member.DoesNotExist:
-        pass
-    except Exception:
-        pass
-    
-    return False
+    return _linked_member_role(user) == 'admin'
+
+
+def _is_admin_member(member):
+    """Admin check for an already-loaded Member, without re-querying it from its user"""
+    user = member.user
+    if user and (user.is_staff or user.is_superuser):
+        return True
+    return member.role == 'admin' and member.is_active
 
 
 def is_cashier_or_admin(user):
@@ -110,16 +144,28 @@ def is_cashier_or_admin(user):
         return True
     
     # Check if user is linked to a Member with cashier or admin role
-    try:
-        member = Member.objects.get(user=user)
-        if member.role in ['cashier', 'admin'] and member.is_active:
-            return True
-    except Member.DoesNotExist:
-        pass
-    except Exception:
-        pass
-    
-    return False
+    return _linked_member_role(user) in ['cashier', 'admin']
+
+
+def get_request_member(request):
+    """Active Member linked to the logged-in user, looked up once per request"""
+    if not hasattr(request, '_user_member'):
+        # filter().first() is a single LIMIT 1 query and also covers the
+        # (unexpected) case of several members linked to one user
+        request._user_member = Member.objects.filter(user=request.user, is_active=True).first()
+    return request._user_member
+
+
+def request_has_full_access(request):
+    """Request-cached is_cashier_or_admin() that reuses the request's member lookup"""
+    if not hasattr(request, '_has_full_access'):
+        user = request.user
+        if user.is_staff or user.is_superuser:
+            request._has_full_access = True
+        else:
+            member = get_request_member(request)
+            request._has_full_access = bool(member and member.role in ['cashier', 'admin'])
+    return request._has_full_access
 
 
 @login_required
@@ -147,7 +193,10 @@ def dashboard(request):
     low_stock_products = Product.objects.filter(is_active=True, stock_quantity__lte=10).count()
     out_of_stock_products = Product.objects.filter(is_active=True, stock_quantity=0).count()
 
-    recent_transactions = base_qs.order_by('-created_at')[:10]
+    recent_transactions = base_qs.select_related('member').only(
+        'transaction_number', 'total_amount', 'payment_method', 'created_at',
+        'member__first_name', 'member__last_name',
+    ).order_by('-created_at')[:10]
     top_products = TransactionItem.objects.filter(transaction__status='completed').values('product_name').annotate(
         total_sold=Sum('quantity'),
         total_revenue=Sum('total_price')
@@ -195,55 +244,8 @@ def dashboard(request):
     ).order_by('-total_spent')[:5]
 
     # --- Refund statistics ---
-    # Refunds are identified by: status='cancelled' AND notes contains 'Refund'
-    # When a refund is processed, the transaction status is set to 'cancelled' and notes contain 'Refunded'
-    # Also check BalanceTransaction records to catch any refunds that might have different note formats
-    import re
-    
-    # Get transaction numbers from BalanceTransaction records with "Refund" in notes
-    refund_balance_txns = BalanceTransaction.objects.filter(
-        notes__icontains='Refund'
-    ).values_list('notes', flat=True)
-    
-    # Extract transaction numbers from balance transaction notes
-    refund_txn_numbers = set()
-    for note in refund_balance_txns:
-        # Match patterns like "Refund for transaction TXN-123" or "Refund for transaction TXN123"
-        matches = re.findall(r'transaction\s+([A-Z0-9-]+)', note, re.IGNORECASE)
-        refund_txn_numbers.update(matches)
-    
-    # Query for refunds: cancelled transactions with 'Refund' in notes OR transactions with numbers from balance records
-    refund_qs = Transaction.objects.filter(
-        Q(status='cancelled', notes__icontains='Refund') |
-        Q(transaction_number__in=refund_txn_numbers)
-    ).distinct()
-    
-    total_refunds = refund_qs.count()
-    total_refund_amount = refund_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    today_refunds = refund_qs.filter(updated_at__date=today).count()
-    today_refund_amount = refund_qs.filter(updated_at__date=today).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    
-    # Recent refunds
-    recent_refunds = refund_qs.order_by('-updated_at')[:10]
-    
-    # Daily refund trend (14 days)
-    daily_refunds_raw = refund_qs.filter(updated_at__date__gte=two_weeks_ago).annotate(
-        day=TruncDate('updated_at')
-    ).values('day').annotate(
-        total=Sum('total_amount'),
-        count=Count('id')
-    ).order_by('day')
-    
-    daily_refunds_map = {entry['day']: {'amount': float(entry['total'] or 0), 'count': entry['count']} for entry in daily_refunds_raw}
-    daily_refund_labels = []
-    daily_refund_amounts = []
-    daily_refund_counts = []
-    for offset in range(14):
-        day = two_weeks_ago + timedelta(days=offset)
-        daily_refund_labels.append(day.strftime('%b %d'))
-        refund_data = daily_refunds_map.get(day, {'amount': 0, 'count': 0})
-        daily_refund_amounts.append(round(refund_data['amount'], 2))
-        daily_refund_counts.append(refund_data['count'])
+    # Aggregates and the recent-refunds list are precomputed by the scheduler and served from the cache
+    refund_stats = get_refund_stats()
 
     context = {
         'total_transactions': total_transactions,
@@ -266,15 +268,8 @@ def dashboard(request):
         'category_labels': json.dumps(category_labels),
         'category_totals': json.dumps(category_totals),
         'user_display_name': request.user.get_full_name() or request.user.username,
-        # Refund statistics
-        'total_refunds': total_refunds,
-        'total_refund_amount': total_refund_amount,
-        'today_refunds': today_refunds,
-        'today_refund_amount': today_refund_amount,
-        'recent_refunds': recent_refunds,
-        'daily_refund_labels': json.dumps(daily_refund_labels),
-        'daily_refund_amounts': json.dumps(daily_refund_amounts),
-        'daily_refund_counts': json.dumps(daily_refund_counts),
+        # Refund statistics (includes recent_refunds)
+        **refund_stats,
     }
 
     return render(request, 'admin_panel/dashboard.html', context)
@@ -903,7 +898,10 @@ def user_transactions(request):
     
     try:
         # Try to get the member associated with the logged-in user
-        member = Member.objects.get(user=request.user, is_active=True)
+        member = get_request_member(request)
+        if member is None:
+            # User doesn't have a member account
+            raise Member.DoesNotExist
         
         # Get last 10 completed transactions for this member
         # Prefetch related items to avoid N+1 queries
@@ -928,15 +926,6 @@ def user_transactions(request):
     except Member.DoesNotExist:
         # User doesn't have a member account
         pass
-    except Member.MultipleObjectsReturned:
-        # Multiple members found for this user (shouldn't happen, but handle it)
-        member = Member.objects.filter(user=request.user, is_active=True).first()
-        if member:
-            transactions = Transaction.objects.filter(
-                member=member,
-                status='completed'
-            ).select_related('member').prefetch_related('items').order_by('-created_at')[:10]
-            transactions = list(transactions)
     except Exception as e:
         # Log error for debugging
         import logging
@@ -961,7 +950,7 @@ def api_rfid_login(request):
             return JsonResponse({'success': False, 'error': 'RFID is required'})
         
         try:
-            member = Member.objects.get(rfid_card_number=rfid, is_active=True)
+            member = Member.objects.select_related('user').get(rfid_card_number=rfid, is_active=True)
         except Member.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Member not found or inactive'})
         
@@ -973,7 +962,7 @@ def api_rfid_login(request):
         
         # Determine redirect URL
         next_url = data.get('next') or 'dashboard'
-        if is_admin_user(member.user):
+        if _is_admin_member(member):
             if next_url == 'dashboard':
                 redirect_url = '/dashboard/'
             elif next_url and next_url.startswith('/') and next_url != '/admin/':
@@ -1014,13 +1003,19 @@ def api_search_members(request):
         return JsonResponse({'success': True, 'members': []})
     
     try:
-        # Search by RFID (exact or partial) or by name
-        members = Member.objects.filter(
-            Q(rfid_card_number__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query)
-        ).filter(is_active=True)[:20]
+        members = None
+        if RFID_QUERY_RE.fullmatch(query):
+            # Scanned card: try the unique RFID index before the OR'd icontains scan
+            members = list(Member.objects.filter(rfid_card_number=query, is_active=True)[:1])
+        
+        if not members:
+            # Search by RFID (exact or partial) or by name
+            members = Member.objects.filter(
+                Q(rfid_card_number__icontains=query) |
+                Q(first_name__icontains=query) |
+                Q(last_name__icontains=query) |
+                Q(email__icontains=query)
+            ).filter(is_active=True)[:20]
         
         results = []
         for member in members:
@@ -1045,7 +1040,8 @@ def api_refill_balance(request):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
     """Refill/add balance to a member's card"""
     try:
-        data = json.loads(request.body)
+        # Parse JSON numbers with a fraction straight into Decimal (no float round-trip)
+        data = json.loads(request.body, parse_float=Decimal)
         member_id = data.get('member_id')
         amount = data.get('amount')
         notes = data.get('notes', '').strip()
@@ -1056,39 +1052,54 @@ def api_refill_balance(request):
         if not amount:
             return JsonResponse({'success': False, 'error': 'Amount is required'})
         
+        # bool is an int subclass; JSON true must not become Decimal(1)
+        if isinstance(amount, bool):
+            return JsonResponse({'success': False, 'error': 'Invalid amount format'}, status=400)
+        
         try:
-            amount = Decimal(str(amount))
+            if not isinstance(amount, Decimal):
+                # ints and numeric strings convert exactly
+                amount = Decimal(amount) if isinstance(amount, (int, str)) else Decimal(str(amount))
+            if not amount.is_finite():
+                raise InvalidOperation
             if amount <= 0:
                 return JsonResponse({'success': False, 'error': 'Amount must be greater than zero'})
-        except (InvalidOperation, ValueError):
+        except (InvalidOperation, ValueError, TypeError):
             return JsonResponse({'success': False, 'error': 'Invalid amount format'})
         
-        try:
-            member = Member.objects.get(id=member_id, is_active=True)
-        except Member.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Member not found'})
-        
-        # Record balance before
-        balance_before = member.balance
-        utang_before = member.utang_balance
-        
-        # Add balance
-        member.add_balance(amount)
-        
-        # Record balance after
-        balance_after = member.balance
-        
-        # Create balance transaction record
-        BalanceTransaction.objects.create(
-            member=member,
-            transaction_type='deposit',
-            amount=amount,
-            balance_before=balance_before,
-            balance_after=balance_after,
-            utang_before=utang_before,
-            utang_after=utang_before,  # Utang unchanged
-            notes=f"Balance refill by admin. {notes}" if notes else "Balance refill by admin"
-        )
+        with db_transaction.atomic():
+            # Lock the member row so the before/after snapshot matches the UPDATE
+            try:
+                member = Member.objects.select_for_update().get(id=member_id, is_active=True)
+            except Member.DoesNotExist:
+                return JsonResponse({'success': False, 'error': 'Member not found'})
+            
+            # Record balance before
+            balance_before = member.balance
+            utang_before = member.utang_balance
+            
+            # Add balance with a single UPDATE instead of a full-row save()
+            member.balance = balance_before + amount
+            member.updated_at = timezone.now()
+            Member.objects.filter(pk=member.pk).update(
+                balance=F('balance') + amount,
+                updated_at=member.updated_at,
+            )
+            
+            # Record balance after
+            balance_after = member.balance
+            
+            # Create balance transaction record in the same atomic block
+            BalanceTransaction.objects.create(
+                member=member,
+                transaction_type='deposit',
+                amount=amount,
+                balance_before=balance_before,
+                balance_after=balance_after,
+                utang_before=utang_before,
+                utang_after=utang_before,  # Utang unchanged
+                notes=f"Balance refill by admin. {notes}" if notes else "Balance refill by admin"
+            )
         
         return JsonResponse({
             'success': True,
@@ -1114,7 +1125,8 @@ def api_update_patronage_rate(request):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
     """Update patronage rate for a member type"""
     try:
-        data = json.loads(request.body)
+        # Parse JSON numbers with a fraction straight into Decimal (no float round-trip)
+        data = json.loads(request.body, parse_float=Decimal)
         member_type_id = data.get('member_type_id')
         patronage_rate = data.get('patronage_rate')
         
@@ -1124,11 +1136,17 @@ def api_update_patronage_rate(request):
         if patronage_rate is None:
             return JsonResponse({'success': False, 'error': 'Patronage rate is required'})
         
+        # bool is an int subclass; JSON true must not become Decimal(1)
+        if isinstance(patronage_rate, bool):
+            return JsonResponse({'success': False, 'error': 'Invalid patronage rate format'}, status=400)
+        
         try:
-            patronage_rate = Decimal(str(patronage_rate))
+            if not isinstance(patronage_rate, Decimal):
+                # ints and numeric strings convert exactly
+                patronage_rate = Decimal(patronage_rate) if isinstance(patronage_rate, (int, str)) else Decimal(str(patronage_rate))
             if patronage_rate < 0 or patronage_rate > 1:
                 return JsonResponse({'success': False, 'error': 'Patronage rate must be between 0 and 1'})
-        except (InvalidOperation, ValueError):
+        except (InvalidOperation, ValueError, TypeError):
             return JsonResponse({'success': False, 'error': 'Invalid patronage rate format'})
         
         try:
@@ -1156,18 +1174,35 @@ def api_update_patronage_rate(request):
         return JsonResponse({'success': False, 'error': f'Server error: {str(e)}'})
 
 
-def generate_refund_receipt_data(transaction, refund_reason, member, balance_before=None, balance_after=None, utang_before=None, utang_after=None, request=None):
-    """Generate refund receipt text data"""
+def format_timestamp(value):
+    """Format a datetime as 'YYYY-MM-DD HH:MM:SS' without going through strftime"""
+    # isoformat() appends the UTC offset for aware datetimes; keep the first 19 chars
+    return value.isoformat(sep=' ', timespec='seconds')[:19]
+
+
+def money(v, places=2):
+    """Format a currency amount for receipt text"""
+    q = CENTS if places == 2 else quantizer(places)
+    if v is None:
+        return f'₱{Decimal(0).quantize(q)}'
+    if not isinstance(v, Decimal):
+        v = Decimal(str(v))
+    return f'₱{v.quantize(q)}'
+
+
+def generate_refund_receipt_data(transaction, refund_reason, member, balance_before=None, balance_after=None, utang_before=None, utang_after=None, request=None, items=None):
+    """Generate refund receipt text data
+
+    ``items`` may be passed by callers that already materialized the
+    transaction's items, to avoid evaluating the relation again.
+    """
+    if items is None:
+        items = list(transaction.items.all())
     from django.conf import settings
     
     vat_rate = getattr(settings, 'VAT_RATE', 0.12)
     lines = []
     
-    def money(v):
-        if v is None:
-            return '₱0.00'
-        return '₱' + str(Decimal(str(v)).quantize(Decimal('0.01')))
-    
     # Header
     lines.append('COOPERATIVE STORE')
     lines.append('REFUND RECEIPT')
@@ -1177,7 +1212,7 @@ def generate_refund_receipt_data(transaction, refund_reason, member, balance_bef
     lines.append('Original Txn:')
     lines.append(transaction.transaction_number)
     lines.append('Refund Date:')
-    lines.append(timezone.localtime(timezone.now()).strftime('%Y-%m-%d %H:%M:%S'))
+    lines.append(format_timestamp(timezone.localtime(timezone.now())))
     lines.append('')
     
     # Member info
@@ -1190,12 +1225,8 @@ def generate_refund_receipt_data(transaction, refund_reason, member, balance_bef
     
     # Items refunded
     lines.append('ITEMS REFUNDED:')
-    for item in transaction.items.all():
-        name = item.product_name
-        qty = item.quantity
-        total = money(item.total_price)
-        lines.append(f'{name} x{qty}')
-        lines.append(total)
+    for item in items:
+        lines += (f'{item.product_name} x{item.quantity}', money(item.total_price))
     lines.append('')
     
     # Amounts
@@ -1269,12 +1300,8 @@ def generate_refund_receipt_html(transaction, refund_reason, member, balance_bef
     }
     
     # Render the template - use request if provided for proper context
-    if request:
-        html = render_to_string('admin_panel/refund_receipt.html', context, request=request)
-    else:
-        html = render_to_string('admin_panel/refund_receipt.html', context)
-    
-    return html
+    # The cached template loader keeps the compiled template (and reloads it under DEBUG)
+    return get_template('admin_panel/refund_receipt.html').render(context, request=request)
 
 
 @login_required
@@ -1307,19 +1334,13 @@ def view_refund_receipt(request, transaction_id):
         )
         
         # Check access control
-        has_full_access = is_cashier_or_admin(request.user)
+        has_full_access = request_has_full_access(request)
         if not has_full_access:
             # Get member associated with the logged-in user
-            try:
-                user_member = Member.objects.get(user=request.user, is_active=True)
-            except Member.DoesNotExist:
+            user_member = get_request_member(request)
+            if not user_member:
                 messages.error(request, 'You do not have permission to view this receipt')
                 return redirect('process_refund')
-            except Member.MultipleObjectsReturned:
-                user_member = Member.objects.filter(user=request.user, is_active=True).first()
-                if not user_member:
-                    messages.error(request, 'You do not have permission to view this receipt')
-                    return redirect('process_refund')
             
             # Check if the transaction belongs to the user
             if transaction.member != user_member:
@@ -1427,19 +1448,13 @@ def view_cash_receipt(request, transaction_id):
         )
         
         # Check access control
-        has_full_access = is_cashier_or_admin(request.user)
+        has_full_access = request_has_full_access(request)
         if not has_full_access:
             # Get member associated with the logged-in user
-            try:
-                user_member = Member.objects.get(user=request.user, is_active=True)
-            except Member.DoesNotExist:
+            user_member = get_request_member(request)
+            if not user_member:
                 messages.error(request, 'You do not have permission to view this receipt')
                 return redirect('transaction_history')
-            except Member.MultipleObjectsReturned:
-                user_member = Member.objects.filter(user=request.user, is_active=True).first()
-                if not user_member:
-                    messages.error(request, 'You do not have permission to view this receipt')
-                    return redirect('transaction_history')
             
             # Check if the transaction belongs to the user
             if transaction.member != user_member:
@@ -1492,19 +1507,13 @@ def view_debit_credit_receipt(request, transaction_id):
         )
         
         # Check access control
-        has_full_access = is_cashier_or_admin(request.user)
+        has_full_access = request_has_full_access(request)
         if not has_full_access:
             # Get member associated with the logged-in user
-            try:
-                user_member = Member.objects.get(user=request.user, is_active=True)
-            except Member.DoesNotExist:
+            user_member = get_request_member(request)
+            if not user_member:
                 messages.error(request, 'You do not have permission to view this receipt')
                 return redirect('transaction_history')
-            except Member.MultipleObjectsReturned:
-                user_member = Member.objects.filter(user=request.user, is_active=True).first()
-                if not user_member:
-                    messages.error(request, 'You do not have permission to view this receipt')
-                    return redirect('transaction_history')
             
             # Check if the transaction belongs to the user
             if transaction.member != user_member:
@@ -1560,30 +1569,31 @@ def api_search_transactions_for_refund(request):
     
     try:
         # Check if user is cashier or admin
-        has_full_access = is_cashier_or_admin(request.user)
+        has_full_access = request_has_full_access(request)
         
-        # Base query for completed transactions
+        # Base query for completed transactions, fetching only the serialized columns
         transactions = Transaction.objects.filter(
             transaction_number__icontains=query,
             status='completed'
-        ).select_related('member').prefetch_related('items')
+        ).only(
+            'id', 'transaction_number', 'total_amount', 'payment_method', 'created_at', 'member',
+        ).annotate(
+            # Built in SQL so the member row never has to be instantiated
+            member_name=Concat('member__first_name', Value(' '), 'member__last_name'),
+        ).prefetch_related(
+            Prefetch('items', queryset=TransactionItem.objects.only(
+                'id', 'transaction_id', 'product_name', 'quantity', 'total_price',
+            ))
+        )
         
         # If user is not cashier/admin, filter to only their own transactions
         if not has_full_access:
             # Get member associated with the logged-in user
-            try:
-                member = Member.objects.get(user=request.user, is_active=True)
-                transactions = transactions.filter(member=member)
-            except Member.DoesNotExist:
+            member = get_request_member(request)
+            if not member:
                 # User doesn't have a member account, return empty results
                 return JsonResponse({'success': True, 'transactions': []})
-            except Member.MultipleObjectsReturned:
-                # Multiple members found, use the first one
-                member = Member.objects.filter(user=request.user, is_active=True).first()
-                if member:
-                    transactions = transactions.filter(member=member)
-                else:
-                    return JsonResponse({'success': True, 'transactions': []})
+            transactions = transactions.filter(member=member)
         
         # Order and limit results
         transactions = transactions.order_by('-created_at')[:20]
@@ -1591,23 +1601,24 @@ def api_search_transactions_for_refund(request):
         results = []
         for transaction in transactions:
             # Get transaction items
-            items = []
-            for item in transaction.items.all():
-                items.append({
+            items = [
+                {
                     'product_name': item.product_name,
                     'quantity': item.quantity,
                     'total_price': str(item.total_price),
-                })
+                }
+                for item in transaction.items.all()
+            ]
             
             results.append({
                 'id': transaction.id,
                 'transaction_number': transaction.transaction_number,
-                'member_name': transaction.member.full_name if transaction.member else 'Guest',
-                'member_id': transaction.member.id if transaction.member else None,
+                'member_name': transaction.member_name if transaction.member_id else 'Guest',
+                'member_id': transaction.member_id,
                 'total_amount': str(transaction.total_amount),
                 'payment_method': transaction.get_payment_method_display(),
-                'created_at': transaction.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'items_count': transaction.items.count(),
+                'created_at': format_timestamp(transaction.created_at),
+                'items_count': len(items),
                 'items': items,
             })
         
@@ -1633,75 +1644,98 @@ def api_process_refund(request):
         if not transaction_id:
             return JsonResponse({'success': False, 'error': 'Transaction ID is required'})
         
-        try:
-            # Prefetch related items for receipt generation
-            transaction = Transaction.objects.select_related('member').prefetch_related('items').get(id=transaction_id, status='completed')
-        except Transaction.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Transaction not found or not eligible for refund'})
-        
-        # Check access control: regular members can only refund their own transactions
-        has_full_access = is_cashier_or_admin(request.user)
-        if not has_full_access:
-            # Get member associated with the logged-in user
+        # All refund writes commit together
+        with db_transaction.atomic():
             try:
-                user_member = Member.objects.get(user=request.user, is_active=True)
-            except Member.DoesNotExist:
-                return JsonResponse({'success': False, 'error': 'You do not have permission to process refunds'}, status=403)
-            except Member.MultipleObjectsReturned:
-                user_member = Member.objects.filter(user=request.user, is_active=True).first()
+                # Prefetch related items for receipt generation and lock the
+                # transaction row so it cannot be refunded twice concurrently
+                transaction = Transaction.objects.select_for_update(of=('self',)).select_related('member').prefetch_related('items').get(id=transaction_id, status='completed')
+            except Transaction.DoesNotExist:
+                return JsonResponse({'success': False, 'error': 'Transaction not found or not eligible for refund'})
+        
+            # Check access control: regular members can only refund their own transactions
+            has_full_access = request_has_full_access(request)
+            if not has_full_access:
+                # Get member associated with the logged-in user
+                user_member = get_request_member(request)
                 if not user_member:
                     return JsonResponse({'success': False, 'error': 'You do not have permission to process refunds'}, status=403)
             
-            # Check if the transaction belongs to the user
-            if transaction.member != user_member:
-                return JsonResponse({'success': False, 'error': 'You can only refund your own transactions'}, status=403)
-        
-        member = transaction.member
-        
-        # Capture balances before refund for receipt
-        balance_before = None
-        balance_after = None
-        utang_before = None
-        utang_after = None
-        
-        # Process refund - ALL refunds go directly to card balance regardless of payment method
-        if member:
-            # Refund to balance for all payment methods
-            balance_before = member.balance
-            utang_before = member.utang_balance
-            member.add_balance(transaction.total_amount)
-            balance_after = member.balance
-            utang_after = member.utang_balance  # Utang remains unchanged
+                # Check if the transaction belongs to the user
+                if transaction.member != user_member:
+                    return JsonResponse({'success': False, 'error': 'You can only refund your own transactions'}, status=403)
+        
+            member = transaction.member
+            if member:
+                # Lock the member row before reading the balance snapshot
+                member = Member.objects.select_for_update().get(pk=member.pk)
+                transaction.member = member
+        
+            # Capture balances before refund for receipt
+            balance_before = None
+            balance_after = None
+            utang_before = None
+            utang_after = None
+        
+            # Process refund - ALL refunds go directly to card balance regardless of payment method
+            if member:
+                # Refund to balance for all payment methods
+                balance_before = member.balance
+                utang_before = member.utang_balance
+                # Row is locked above, so a single UPDATE keeps the snapshot exact
+                member.balance = balance_before + transaction.total_amount
+                member.updated_at = timezone.now()
+                Member.objects.filter(pk=member.pk).update(
+                    balance=F('balance') + transaction.total_amount,
+                    updated_at=member.updated_at,
+                )
+                balance_after = member.balance
+                utang_after = member.utang_balance  # Utang remains unchanged
             
-            # Record balance transaction
-            BalanceTransaction.objects.create(
-                member=member,
-                transaction_type='deposit',
-                amount=transaction.total_amount,
-                balance_before=balance_before,
-                balance_after=balance_after,
-                utang_before=utang_before,
-                utang_after=utang_after,
-                notes=f"Refund for transaction {transaction.transaction_number} (Original: {transaction.get_payment_method_display()}). {refund_reason}" if refund_reason else f"Refund for transaction {transaction.transaction_number} (Original: {transaction.get_payment_method_display()})"
+                # Record balance transaction
+                BalanceTransaction.objects.create(
+                    member=member,
+                    transaction_type='deposit',
+                    amount=transaction.total_amount,
+                    balance_before=balance_before,
+                    balance_after=balance_after,
+                    utang_before=utang_before,
+                    utang_after=utang_after,
+                    notes=f"Refund for transaction {transaction.transaction_number} (Original: {transaction.get_payment_method_display()}). {refund_reason}" if refund_reason else f"Refund for transaction {transaction.transaction_number} (Original: {transaction.get_payment_method_display()})"
+                )
+        
+            # Restore product stock with a single UPDATE across all refunded products
+            items = list(transaction.items.all())
+            restock = {}
+            for item in items:
+                if item.product_id:
+                    restock[item.product_id] = restock.get(item.product_id, 0) + item.quantity
+            if restock:
+                Product.objects.filter(id__in=restock).update(
+                    stock_quantity=F('stock_quantity') + Case(
+                        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in restock.items()],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+        
+            # Mark transaction as cancelled, writing only the changed columns
+            transaction.status = 'cancelled'
+            transaction.notes = f"Refunded. {refund_reason}" if refund_reason else "Refunded"
+            # updated_at doubles as the refund date, and update() skips auto_now
+            transaction.updated_at = timezone.now()
+            Transaction.objects.filter(pk=transaction.pk).update(
+                status=transaction.status,
+                notes=transaction.notes,
+                updated_at=transaction.updated_at,
             )
-        
-        # Restore product stock
-        for item in transaction.items.all():
-            if item.product:
-                item.product.stock_quantity += item.quantity
-                item.product.save()
-        
-        # Mark transaction as cancelled
-        transaction.status = 'cancelled'
-        transaction.notes = f"Refunded. {refund_reason}" if refund_reason else "Refunded"
-        transaction.save()
-        
-        # Refresh member to get updated balances
-        if member:
-            member.refresh_from_db()
+            
+            # New refund must show up on the dashboard right away
+            db_transaction.on_commit(invalidate_refund_stats)
         
         # Generate refund receipt data - pass request for proper template rendering
-        receipt_data = generate_refund_receipt_data(transaction, refund_reason, member, balance_before, balance_after, utang_before, utang_after, request=request)
+        receipt_data = generate_refund_receipt_data(transaction, refund_reason, member, balance_before, balance_after, utang_before, utang_after, request=request, items=items)
         
         return JsonResponse({
             'success': True,
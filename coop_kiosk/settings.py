@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,9 +25,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SESSION_SECRET', 'django-insecure-7oua%&pbjg344oj597*jt@8avam@_w32=89jm9^uj5k^2y#0g!')
 
+# Secret mixed into member PIN hashes (members.models.hash_pin). Changing it
+# invalidates every stored PIN. It must be set explicitly in production: the
+# SECRET_KEY fallback above is public, and a public pepper lets anyone holding a
+# database dump try all 10,000 PINs at once.
+PIN_PEPPER = os.environ.get('PIN_PEPPER')
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+if not PIN_PEPPER:
+    if not DEBUG:
+        raise ImproperlyConfigured('The PIN_PEPPER environment variable must be set when DEBUG is off.')
+    # Development only
+    PIN_PEPPER = SECRET_KEY
+
 ALLOWED_HOSTS = ['*']
 
 
@@ -163,6 +177,52 @@ VAT_FIXED = 12.00
 # Patronage Configuration
 DEFAULT_PATRONAGE_RATE = 0.05  # 5% default patronage rate
 
+# Dashboard Configuration
+# Refund statistics are recomputed by the scheduler at this interval and
+# served from the cache between runs.
+DASHBOARD_REFUND_STATS_REFRESH_MINUTES = 5
+
+# Cache
+# The default cache stays per-process; the 'shared' alias is database-backed so
+# a refund in one worker invalidates the dashboard statistics in every worker.
+# Its table is created by the admin_panel migrations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'coop_kiosk_cache',
+    },
+}
+
+# Logging
+# Kiosk checkout logs go through a queue so request threads never block on
+# console output; a listener thread writes them to stderr.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'kiosk': {
+            'format': '{asctime} {levelname} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'kiosk_queue': {
+            'class': 'kiosk.log_queue.QueuedStreamHandler',
+            'formatter': 'kiosk',
+        },
+    },
+    'loggers': {
+        'kiosk': {
+            'handlers': ['kiosk_queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Authentication Settings
 LOGIN_URL = '/'  # Root login page
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -179,6 +239,7 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    'EXCEPTION_HANDLER': 'mobile_api.exceptions.mobile_exception_handler',
 }
 
 # CORS Settings for Mobile App
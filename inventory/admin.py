@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
 from .models import Category, Product, StockTransaction
 
 
@@ -11,7 +12,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'barcode', 'category', 'price', 'stock_quantity', 'is_low_stock', 'is_active']
+    list_display = ['name', 'barcode', 'category', 'price', 'stock_quantity', 'low_stock', 'is_active']
     list_filter = ['is_active', 'category']
     search_fields = ['name', 'barcode']
     readonly_fields = ['created_at', 'updated_at']
@@ -34,6 +35,21 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Compute the low stock flag in SQL so the column can be sorted
+        return super().get_queryset(request).annotate(
+            low_stock_flag=ExpressionWrapper(
+                Q(stock_quantity__lte=F('low_stock_threshold')),
+                output_field=BooleanField(),
+            )
+        )
+
+    def low_stock(self, obj):
+        return obj.low_stock_flag
+    low_stock.boolean = True
+    low_stock.short_description = 'Is low stock'
+    low_stock.admin_order_field = 'low_stock_flag'
+
 
 @admin.register(StockTransaction)
 class StockTransactionAdmin(admin.ModelAdmin):
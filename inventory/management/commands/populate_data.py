@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from members.models import MemberType, Member
+from members.models import MemberType, Member, hash_pin
 from inventory.models import Category, Product
 from decimal import Decimal
 
@@ -27,8 +27,9 @@ class Command(BaseCommand):
             {'rfid': '1003', 'first_name': 'Pedro', 'last_name': 'Reyes', 'balance': 2000.00},
         ]
         
+        members = []
         for data in members_data:
-            member = Member.objects.create(
+            member = Member(
                 rfid_card_number=data['rfid'],
                 first_name=data['first_name'],
                 last_name=data['last_name'],
@@ -36,18 +37,21 @@ class Command(BaseCommand):
                 member_type=member_type,
                 balance=Decimal(str(data['balance']))
             )
-            # set a sample 4-digit PIN for the member for demo/testing
-            try:
-                # generate a simple sample PIN based on rfid to keep it deterministic
-                sample_pin = (str(data['rfid'])[-4:]).zfill(4)[:4]
-                member.set_pin(sample_pin)
-            except Exception:
-                pass
+            # set a sample 4-digit PIN for the member for demo/testing; hashed
+            # here rather than via set_pin(), which would save each row.
+            # generate a simple sample PIN based on rfid to keep it deterministic
+            sample_pin = (str(data['rfid'])[-4:]).zfill(4)[:4]
+            member.pin_hash = hash_pin(sample_pin)
+            members.append(member)
+        Member.objects.bulk_create(members)
+        for member in members:
             self.stdout.write(f'Created member: {member.full_name} (RFID: {member.rfid_card_number})')
         
-        category1 = Category.objects.create(name='Beverages', description='Drinks and beverages')
-        category2 = Category.objects.create(name='Snacks', description='Chips and snacks')
-        category3 = Category.objects.create(name='Groceries', description='General groceries')
+        category1, category2, category3 = Category.objects.bulk_create([
+            Category(name='Beverages', description='Drinks and beverages'),
+            Category(name='Snacks', description='Chips and snacks'),
+            Category(name='Groceries', description='General groceries'),
+        ])
         self.stdout.write(f'Created categories')
         
         products_data = [
@@ -68,8 +72,8 @@ class Command(BaseCommand):
             {'barcode': '8888888888895', 'name': 'Bread Loaf', 'category': category3, 'price': 45.00, 'stock': 80},
         ]
         
-        for data in products_data:
-            product = Product.objects.create(
+        products = Product.objects.bulk_create([
+            Product(
                 barcode=data['barcode'],
                 name=data['name'],
                 category=data['category'],
@@ -77,6 +81,9 @@ class Command(BaseCommand):
                 cost=Decimal(str(data['price'] * 0.7)),
                 stock_quantity=data['stock']
             )
+            for data in products_data
+        ])
+        for product in products:
             self.stdout.write(f'Created product: {product.name} (Barcode: {product.barcode})')
         
         self.stdout.write(self.style.SUCCESS('Successfully populated sample data!'))
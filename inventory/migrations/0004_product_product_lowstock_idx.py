@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_remove_expiration_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock_quantity__lte', 10)), fields=['stock_quantity'], name='product_lowstock_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-16 10:00
+
+from django.db import migrations
+
+
+def create_product_search_trgm_indexes(apps, schema_editor):
+    # Trigram indexes let the kiosk search's icontains ('%q%') lookups use an
+    # index instead of a sequential scan; PostgreSQL only.
+    # Django compiles icontains to UPPER(col::text) LIKE UPPER(...), so index that expression
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm_idx '
+        'ON inventory_product USING gin ((UPPER(name::text)) gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_barcode_trgm_idx '
+        'ON inventory_product USING gin ((UPPER(barcode::text)) gin_trgm_ops)'
+    )
+
+
+def drop_product_search_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS product_barcode_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_product_product_lowstock_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_product_search_trgm_indexes, drop_product_search_trgm_indexes),
+    ]
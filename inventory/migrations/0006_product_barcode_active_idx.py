@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-16 10:30
+
+from django.db import migrations
+
+
+def create_product_barcode_active_index(apps, schema_editor):
+    # Partial covering index for kiosk barcode scans: both scan_product queries
+    # can be answered by an index-only scan. INCLUDE needs PostgreSQL 11+, so
+    # other databases keep using the unique barcode index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_barcode_active_idx '
+        'ON inventory_product (barcode) '
+        'INCLUDE (id, name, price, image, stock_quantity) '
+        'WHERE is_active'
+    )
+
+
+def drop_product_barcode_active_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_barcode_active_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_product_search_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_product_barcode_active_index, drop_product_barcode_active_index),
+    ]
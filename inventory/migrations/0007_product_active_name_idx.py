@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-16 11:00
+
+from django.db import migrations
+
+
+def create_product_active_name_index(apps, schema_editor):
+    # Partial covering index for the kiosk search's ORDER BY name LIMIT 50 over
+    # active products; INCLUDE needs PostgreSQL 11+, so other databases skip it.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_active_name_idx '
+        'ON inventory_product (name) '
+        'INCLUDE (id, barcode, price, stock_quantity) '
+        'WHERE is_active'
+    )
+
+
+def drop_product_active_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_active_name_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_barcode_active_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_product_active_name_index, drop_product_active_name_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-16 11:30
+
+from django.db import migrations, models
+
+PRODUCT_ACTIVE_NAME_ORD_INDEX = models.Index(fields=['is_active', 'name'], name='product_active_name_ord_idx')
+
+
+def create_product_active_name_ord_index(apps, schema_editor):
+    # PostgreSQL already serves this ordering from the partial covering
+    # product_active_name_idx (0007), so only other databases get the B-tree.
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('inventory', 'Product'), PRODUCT_ACTIVE_NAME_ORD_INDEX)
+
+
+def drop_product_active_name_ord_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('inventory', 'Product'), PRODUCT_ACTIVE_NAME_ORD_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_product_active_name_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_product_active_name_ord_index, drop_product_active_name_ord_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='product',
+                    index=PRODUCT_ACTIVE_NAME_ORD_INDEX,
+                ),
+            ],
+        ),
+    ]
@@ -70,6 +70,17 @@ class Product(models.Model):
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ['name']
+        indexes = [
+            # Partial index for the dashboard low/out-of-stock counters
+            models.Index(
+                fields=['stock_quantity'],
+                condition=models.Q(is_active=True, stock_quantity__lte=10),
+                name='product_lowstock_idx',
+            ),
+            # Kiosk search filters on is_active and reads rows in name order; migration 0008
+            # skips it on PostgreSQL, where the partial product_active_name_idx covers it
+            models.Index(fields=['is_active', 'name'], name='product_active_name_ord_idx'),
+        ]
 
 
 class StockTransaction(models.Model):
@@ -0,0 +1,29 @@
+"""
+Signal handlers for inventory models.
+Drops the kiosk barcode scan and product search cache entries when a product is edited.
+The entries live in the default cache, which is per-process: the invalidation only
+reaches the worker that saved the product, and other workers can serve the old
+name/price until the entry's short timeout runs out. Checkout always re-reads price
+and stock from the database, so a stale entry only affects what the kiosk displays.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from kiosk.cache_keys import product_scan_cache_key, PRODUCT_SEARCH_VERSION_KEY
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_caches(sender, instance, **kwargs):
+    """
+    Drop the cached scan payload and searches whenever a product is saved or deleted.
+    Only this process's cache is cleared; other workers rely on the kiosk.cache_keys timeouts.
+    """
+    cache.delete(product_scan_cache_key(instance.barcode))
+    try:
+        cache.incr(PRODUCT_SEARCH_VERSION_KEY)
+    except ValueError:
+        # Version key was evicted; any entries under the old version expire on their own
+        cache.set(PRODUCT_SEARCH_VERSION_KEY, 2, None)
@@ -1,3 +1,39 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from kiosk.cache_keys import product_scan_cache_key, PRODUCT_SEARCH_VERSION_KEY
+from .models import Product
+
+
+class ProductCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Pencil', barcode='PEN001', price=Decimal('10.00'), stock_quantity=5)
+        cache.set(product_scan_cache_key('PEN001'), {'name': 'Pencil', 'price': '10.00'})
+        cache.set(PRODUCT_SEARCH_VERSION_KEY, 1, None)
+
+    def test_save_drops_the_scan_payload_and_bumps_the_search_version(self):
+        self.product.price = Decimal('12.00')
+        self.product.save()
+
+        self.assertIsNone(cache.get(product_scan_cache_key('PEN001')))
+        self.assertEqual(cache.get(PRODUCT_SEARCH_VERSION_KEY), 2)
+
+    def test_delete_drops_the_scan_payload(self):
+        self.product.delete()
+
+        self.assertIsNone(cache.get(product_scan_cache_key('PEN001')))
+        self.assertEqual(cache.get(PRODUCT_SEARCH_VERSION_KEY), 2)
+
+    def test_evicted_search_version_is_restarted_past_the_first(self):
+        cache.delete(PRODUCT_SEARCH_VERSION_KEY)
+
+        self.product.save()
+
+        self.assertEqual(cache.get(PRODUCT_SEARCH_VERSION_KEY), 2)
+
+    def test_scan_key_is_hashed_per_barcode(self):
+        self.assertNotIn('PEN001', product_scan_cache_key('PEN001'))
+        self.assertNotEqual(product_scan_cache_key('PEN001'), product_scan_cache_key('PEN0011'))
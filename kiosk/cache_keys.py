@@ -0,0 +1,32 @@
+"""
+Cache keys and timeouts for the kiosk barcode scan and product search responses.
+inventory.signals drops these entries when a product is saved or deleted. They live
+in the per-process default cache, so other workers rely on the timeouts below.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+# Seconds a scanned product's name/price/image stay cached for the kiosk; this also
+# bounds how long another worker can show them after an edit
+PRODUCT_SCAN_CACHE_TIMEOUT = 60
+
+
+def product_scan_cache_key(barcode):
+    """Cache key for the kiosk scan payload of a product barcode"""
+    # Hash the client-supplied barcode so the key stays short and memcached-safe
+    digest = hashlib.md5(str(barcode).encode()).hexdigest()
+    return f'prod:bc:{digest}'
+
+
+# Seconds a kiosk search response stays cached; stock is part of the response,
+# and sales update it without going through save(), so keep this short
+PRODUCT_SEARCH_CACHE_TIMEOUT = 30
+PRODUCT_SEARCH_VERSION_KEY = 'ps:version'
+
+
+async def aproduct_search_cache_key(query):
+    """Cache key for a kiosk search response; bumping the version drops every cached search"""
+    version = await cache.aget_or_set(PRODUCT_SEARCH_VERSION_KEY, 1, None)
+    digest = hashlib.md5(query.lower().encode()).hexdigest()
+    return f'ps:{version}:{digest}'
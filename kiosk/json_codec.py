@@ -0,0 +1,29 @@
+"""
+JSON request/response helpers for the kiosk-facing endpoints.
+orjson is used when it is installed; otherwise the stdlib codec is used.
+"""
+import json
+
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; the stdlib codec is used when it is not installed
+    orjson = None
+
+
+def parse_json_body(body):
+    """Decode a JSON request body, using orjson when it is available"""
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def json_response(payload, status=200):
+    """JsonResponse equivalent that encodes with orjson when it is available"""
+    if orjson is None:
+        return JsonResponse(payload, status=status)
+    # default=str serialises Decimal the same way DjangoJSONEncoder does
+    return HttpResponse(orjson.dumps(payload, default=str), status=status, content_type='application/json')
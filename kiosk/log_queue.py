@@ -0,0 +1,21 @@
+"""
+Non-blocking log handler for the kiosk.
+Request threads only put records on a queue; a background listener thread
+writes them to stderr, so checkout never waits on console I/O.
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueuedStreamHandler(QueueHandler):
+    """QueueHandler that owns a listener writing the queued records to stderr"""
+
+    def __init__(self):
+        log_queue = queue.SimpleQueue()
+        super().__init__(log_queue)
+        # Records arrive already formatted by this handler's formatter (see QueueHandler.prepare)
+        self.listener = QueueListener(log_queue, logging.StreamHandler())
+        self.listener.start()
+        atexit.register(self.listener.stop)
@@ -1,3 +1,158 @@
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction as db_transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.models import Product, StockTransaction
+from members.models import Member, BalanceTransaction
+from transactions.models import Transaction, TransactionItem
+from .views import credit_account, get_system_account
+
+
+class SystemAccountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_credit_freshly_created_system_account(self):
+        with db_transaction.atomic():
+            account = get_system_account('3247035272')
+            balance_before, balance_after = credit_account(account, Decimal('1.50'))
+
+        self.assertEqual(balance_before, Decimal('0.00'))
+        self.assertEqual(balance_after, Decimal('1.50'))
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('1.50'))
+
+    def test_credit_reuses_existing_system_account(self):
+        with db_transaction.atomic():
+            credit_account(get_system_account('3247035272'), Decimal('0.50'))
+        with db_transaction.atomic():
+            account = get_system_account('3247035272')
+            balance_before, balance_after = credit_account(account, Decimal('0.50'))
+
+        self.assertEqual(Member.objects.filter(phone='3247035272').count(), 1)
+        self.assertEqual(balance_before, Decimal('0.50'))
+        self.assertEqual(balance_after, Decimal('1.00'))
+
+
+class ProcessPaymentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pencil = Product.objects.create(name='Pencil', barcode='PEN001', price=Decimal('10.00'), stock_quantity=5)
+        self.notebook = Product.objects.create(name='Notebook', barcode='NB001', price=Decimal('20.00'), stock_quantity=3)
+        self.member = Member.objects.create(
+            rfid_card_number='RFID001', first_name='Juan', last_name='Cruz',
+            balance=Decimal('100.00'), utang_balance=Decimal('0.00'),
+        )
+        self.member.set_pin('1234')
+
+    def pay(self, payload):
+        response = self.client.post(
+            reverse('process_payment'), data=json.dumps(payload), content_type='application/json'
+        )
+        return response.json()
+
+    def scan_member(self):
+        session = self.client.session
+        session['kiosk_member_id'] = self.member.id
+        session.save()
+
+    def test_cash_checkout_reduces_stock_and_records_each_line(self):
+        result = self.pay({
+            'payment_method': 'cash',
+            'cash_amount': '100.00',
+            'items': [
+                {'product_id': self.pencil.id, 'quantity': 2},
+                {'product_id': self.pencil.id, 'quantity': 1},
+                {'product_id': self.notebook.id, 'quantity': 1},
+            ],
+        })
+
+        self.assertTrue(result['success'], result)
+        self.assertEqual(result['transaction']['total_amount'], '50.00')
+        self.assertEqual(result['transaction']['change_amount'], '50.00')
+        self.pencil.refresh_from_db()
+        self.notebook.refresh_from_db()
+        self.assertEqual(self.pencil.stock_quantity, 2)
+        self.assertEqual(self.notebook.stock_quantity, 2)
+        self.assertEqual(TransactionItem.objects.count(), 3)
+        # Repeated cart lines chain their audit rows off the in-memory stock
+        pencil_moves = StockTransaction.objects.filter(product=self.pencil).order_by('id')
+        self.assertEqual(
+            [(move.stock_before, move.stock_after) for move in pencil_moves],
+            [(5, 3), (3, 2)],
+        )
+
+    def test_insufficient_cash_rolls_back_the_sale(self):
+        result = self.pay({
+            'payment_method': 'cash',
+            'cash_amount': '5.00',
+            'items': [{'product_id': self.pencil.id, 'quantity': 2}],
+        })
+
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'].startswith('Insufficient cash'))
+        self.pencil.refresh_from_db()
+        self.assertEqual(self.pencil.stock_quantity, 5)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(StockTransaction.objects.exists())
+        self.assertFalse(BalanceTransaction.objects.exists())
+
+    def test_stock_shortfall_is_rejected_before_any_write(self):
+        result = self.pay({
+            'payment_method': 'cash',
+            'items': [
+                {'product_id': self.notebook.id, 'quantity': 2},
+                {'product_id': self.notebook.id, 'quantity': 2},
+            ],
+        })
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'Insufficient stock for Notebook')
+        self.notebook.refresh_from_db()
+        self.assertEqual(self.notebook.stock_quantity, 3)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_debit_checkout_updates_the_member_in_one_statement(self):
+        self.scan_member()
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.pay({
+                'payment_method': 'debit',
+                'member_id': self.member.id,
+                'pin': '1234',
+                'items': [{'product_id': self.pencil.id, 'quantity': 3}],
+            })
+
+        self.assertTrue(result['success'], result)
+        member_updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "members_member"') and '"last_transaction"' in query['sql']
+        ]
+        self.assertEqual(len(member_updates), 1)
+        self.member.refresh_from_db()
+        # ₱100.00 - ₱1.50 product fee (3 x ₱0.50) - ₱30.00 sale
+        self.assertEqual(self.member.balance, Decimal('68.50'))
+        self.assertEqual(self.member.utang_balance, Decimal('0.00'))
+        self.assertIsNotNone(self.member.last_transaction)
+        # Product fee plus the debit transfer fee
+        system_account = Member.objects.get(phone='3247035272')
+        self.assertEqual(system_account.balance, Decimal('2.00'))
+
+    def test_debit_checkout_requires_the_pin(self):
+        self.scan_member()
+
+        result = self.pay({
+            'payment_method': 'debit',
+            'member_id': self.member.id,
+            'pin': '9999',
+            'items': [{'product_id': self.pencil.id, 'quantity': 1}],
+        })
 
-# Create your tests here.
+        self.assertEqual(result, {'success': False, 'error': 'Invalid PIN'})
+        self.pencil.refresh_from_db()
+        self.assertEqual(self.pencil.stock_quantity, 5)
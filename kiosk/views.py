@@ -1,76 +1,180 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils import timezone
-from django.db.models import Q
-from django.db import transaction as db_transaction
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.db.models import Q, F, Case, When, Value, IntegerField
+from django.db import IntegrityError, transaction as db_transaction
 from inventory.models import Product, StockTransaction
 from members.models import Member, BalanceTransaction
 from transactions.models import Transaction, TransactionItem
+from .cache_keys import (
+    product_scan_cache_key, PRODUCT_SCAN_CACHE_TIMEOUT,
+    aproduct_search_cache_key, PRODUCT_SEARCH_CACHE_TIMEOUT,
+)
+from .json_codec import parse_json_body, json_response
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from html.parser import HTMLParser
+import hashlib
 import json
-import random
-import string
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+import uuid
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 
+logger = logging.getLogger(__name__)
+
+# Currency precision for balance arithmetic
+TWO_PLACES = Decimal('0.01')
+
+# Seconds the fee-collecting system account's primary key stays cached
+SYSTEM_ACCOUNT_CACHE_TIMEOUT = 3600
+
 
 def generate_transaction_number():
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.digits, k=4))
-    return f"TXN{timestamp}{random_str}"
+    now = timezone.now()
+    return f"TXN{now:%Y%m%d%H%M%S}{secrets.randbelow(10000):04d}"
+
+
+def get_system_account(phone):
+    """
+    Active member account that collects kiosk fees for `phone`, created on first use.
+    The account's primary key is cached; the cached lookup re-checks phone and
+    is_active, so a deleted, deactivated or rolled-back account falls through to
+    the full lookup. The row is locked, so call this inside a transaction.
+    """
+    cache_key = f'sysacct:{phone}'
+    account_pk = cache.get(cache_key)
+    if account_pk is not None:
+        account = Member.objects.select_for_update().filter(pk=account_pk, phone=phone, is_active=True).first()
+        if account:
+            return account
+
+    account = Member.objects.select_for_update().filter(phone=phone, is_active=True).first()
+    if not account:
+        account_fields = {
+            'phone': phone,
+            'first_name': 'System',
+            'last_name': 'Account',
+            'role': 'member',
+            'is_active': True,
+            # Explicit Decimal: the model default is a float, which credit_account() can't quantize
+            'balance': Decimal('0.00'),
+        }
+        # Let the unique constraint on rfid_card_number decide instead of probing first;
+        # the savepoint keeps a clash from breaking the caller's transaction
+        try:
+            with db_transaction.atomic():
+                account = Member.objects.create(rfid_card_number=f'ACCOUNT_{phone}', **account_fields)
+        except IntegrityError:
+            # Plain RFID already taken (e.g. by a deactivated account); use a random suffix
+            account = Member.objects.create(
+                rfid_card_number=f'ACCOUNT_{phone}_{uuid.uuid4().hex[:8]}', **account_fields
+            )
+
+    cache.set(cache_key, account.pk, SYSTEM_ACCOUNT_CACHE_TIMEOUT)
+    return account
+
+
+def credit_account(account, amount):
+    """
+    Add `amount` to a member account's balance with a single UPDATE.
+    Returns the (balance_before, balance_after) pair for the BalanceTransaction record.
+    The account must be locked by the caller (get_system_account() does this), so the
+    loaded balance is current and no read-back is needed.
+    """
+    Member.objects.filter(pk=account.pk).update(balance=F('balance') + amount, updated_at=timezone.now())
+    # Decimal(str()) also covers an unsaved-default float balance
+    balance_before = Decimal(str(account.balance)).quantize(TWO_PLACES)
+    account.balance = (balance_before + amount).quantize(TWO_PLACES)
+    return balance_before, account.balance
 
 
 from django.contrib.auth.decorators import login_required
 
+# Payment methods accepted by process_payment, and those charged to a member account
+VALID_PAYMENT_METHODS = frozenset({'debit', 'credit', 'cash'})
+MEMBER_PAYMENT_METHODS = frozenset({'debit', 'credit'})
+
+# VAT settings are fixed for the life of the process; read them once at import
+KIOSK_VAT_CONTEXT = {
+    'VAT_RATE': settings.VAT_RATE,
+    'VAT_INCLUSIVE': settings.VAT_INCLUSIVE,
+}
+
 @login_required
 @ensure_csrf_cookie
 def kiosk_home(request):
-    # Pass VAT settings so client-side JS can use the same configuration
-    context = {
-        'VAT_RATE': settings.VAT_RATE,
-        'VAT_INCLUSIVE': settings.VAT_INCLUSIVE,
-    }
-    return render(request, 'kiosk/kiosk.html', context)
+    # Pass VAT settings so client-side JS can use the same configuration.
+    # Copy so template tags that assign variables never touch the shared dict.
+    return render(request, 'kiosk/kiosk.html', dict(KIOSK_VAT_CONTEXT))
 
 
 @require_http_methods(["POST"])
-def scan_product(request):
+async def scan_product(request):
     try:
-        data = json.loads(request.body)
+        data = parse_json_body(request.body)
         barcode = data.get('barcode')
         
         if not barcode:
-            return JsonResponse({'success': False, 'error': 'Barcode is required'})
+            return json_response({'success': False, 'error': 'Barcode is required'})
         
-        try:
-            product = Product.objects.get(barcode=barcode, is_active=True)
-            
-            if product.stock_quantity <= 0:
-                return JsonResponse({'success': False, 'error': 'Product is out of stock'})
-            
-            return JsonResponse({
-                'success': True,
-                'product': {
-                    'id': product.id,
-                    'name': product.name,
-                    'barcode': product.barcode,
-                    'price': str(product.price),
-                    'image': product.image.url if product.image else None,
-                    'stock': product.stock_quantity,
-                }
-            })
-        except Product.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Product not found'})
+        # Name/price/image come from the cache; stock is always read fresh
+        cache_key = product_scan_cache_key(barcode)
+        product_data = await cache.aget(cache_key)
+        if product_data is None:
+            try:
+                product = await Product.objects.only(
+                    'id', 'name', 'barcode', 'price', 'image', 'stock_quantity'
+                ).aget(barcode=barcode, is_active=True)
+            except Product.DoesNotExist:
+                return json_response({'success': False, 'error': 'Product not found'})
+            product_data = {
+                'id': product.id,
+                'name': product.name,
+                'barcode': product.barcode,
+                'price': str(product.price),
+                'image': product.image.url if product.image else None,
+            }
+            await cache.aset(cache_key, product_data, PRODUCT_SCAN_CACHE_TIMEOUT)
+            stock = product.stock_quantity
+        else:
+            stock = await Product.objects.filter(
+                id=product_data['id'], barcode=barcode, is_active=True
+            ).values_list('stock_quantity', flat=True).afirst()
+            if stock is None:
+                await cache.adelete(cache_key)
+                return json_response({'success': False, 'error': 'Product not found'})
+
+        if stock <= 0:
+            return json_response({'success': False, 'error': 'Product is out of stock'})
+
+        return json_response({
+            'success': True,
+            'product': {**product_data, 'stock': stock}
+        })
     except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+        return json_response({'success': False, 'error': 'Invalid JSON data'})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': 'Server error occurred'})
+        return json_response({'success': False, 'error': 'Server error occurred'})
+
+
+def search_response(payload):
+    """Search results response that the browser may reuse for repeated keystrokes"""
+    response = json_response(payload)
+    patch_cache_control(response, private=True, max_age=PRODUCT_SEARCH_CACHE_TIMEOUT)
+    return response
 
 
 @require_http_methods(["GET"])
-def search_products(request):
+async def search_products(request):
     """
     Simple product search endpoint used by the kiosk JS.
     Query parameter: `q` (string). Returns JSON: { results: [ {id,name,barcode,price,stock}, ... ] }
@@ -79,50 +183,59 @@ def search_products(request):
     q = request.GET.get('q', '')
     q = (q or '').strip()
     if not q or len(q) < 2:
-        return JsonResponse({'results': []})
+        return json_response({'results': []})
+
+    # Typeahead repeats the same queries across kiosks; serve them from the cache
+    cache_key = await aproduct_search_cache_key(q)
+    payload = await cache.aget(cache_key)
+    if payload is not None:
+        return search_response(payload)
 
     try:
         # prefer name icontains, but allow barcode matches as well
         qs = Product.objects.filter(is_active=True)
         # If q looks numeric, include barcode matches first
         if q.isdigit():
-            qs = qs.filter(Q(barcode__icontains=q) | Q(name__icontains=q))
+            qs = qs.filter(Q(barcode__icontains=q) | Q(name__icontains=q)).annotate(
+                barcode_rank=Case(When(barcode=q, then=Value(0)), default=Value(1), output_field=IntegerField())
+            ).order_by('barcode_rank', 'name')
         else:
-            qs = qs.filter(name__icontains=q)
-
-        qs = qs.order_by('name')[:50]
-
-        results = []
-        for p in qs:
-            results.append({
-                'id': p.id,
-                'name': p.name,
-                'barcode': p.barcode,
-                'price': str(p.price),
-                'stock': getattr(p, 'stock_quantity', getattr(p, 'stock', 0)),
-            })
+            qs = qs.filter(name__icontains=q).order_by('name')
+
+        qs = qs.values('id', 'name', 'barcode', 'price', 'stock_quantity')[:50]
+
+        # Plain dicts from values() skip model instantiation per row
+        results = [{
+            'id': p['id'],
+            'name': p['name'],
+            'barcode': p['barcode'],
+            'price': str(p['price']),
+            'stock': p['stock_quantity'],
+        } async for p in qs]
 
-        return JsonResponse({'results': results})
+        payload = {'results': results}
+        await cache.aset(cache_key, payload, PRODUCT_SEARCH_CACHE_TIMEOUT)
+        return search_response(payload)
     except Exception:
-        return JsonResponse({'results': []})
+        return json_response({'results': []})
 
 
 @require_http_methods(["POST"])
-def scan_rfid(request):
+async def scan_rfid(request):
     try:
-        data = json.loads(request.body)
+        data = parse_json_body(request.body)
         rfid = data.get('rfid')
         
         if not rfid:
-            return JsonResponse({'success': False, 'error': 'RFID is required'})
+            return json_response({'success': False, 'error': 'RFID is required'})
         
         try:
-            member = Member.objects.get(rfid_card_number=rfid, is_active=True)
+            member = await Member.objects.aget(rfid_card_number=rfid, is_active=True)
             
-            request.session['kiosk_member_id'] = member.id
-            request.session['kiosk_member_rfid'] = member.rfid_card_number
+            await request.session.aset('kiosk_member_id', member.id)
+            await request.session.aset('kiosk_member_rfid', member.rfid_card_number)
             
-            return JsonResponse({
+            return json_response({
                 'success': True,
                 'member': {
                     'id': member.id,
@@ -134,99 +247,106 @@ def scan_rfid(request):
                 }
             })
         except Member.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Member not found'})
+            return json_response({'success': False, 'error': 'Member not found'})
     except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+        return json_response({'success': False, 'error': 'Invalid JSON data'})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': 'Server error occurred'})
+        return json_response({'success': False, 'error': 'Server error occurred'})
 
 
 @require_http_methods(["POST"])
 @db_transaction.atomic
 def process_payment(request):
     try:
-        data = json.loads(request.body)
+        data = parse_json_body(request.body)
         
         member_id = data.get('member_id')
         items = data.get('items', [])
         payment_method = data.get('payment_method')
         
         if not items:
-            return JsonResponse({'success': False, 'error': 'No items in cart'})
+            return json_response({'success': False, 'error': 'No items in cart'})
         
-        if not payment_method or payment_method not in ['debit', 'credit', 'cash']:
-            return JsonResponse({'success': False, 'error': 'Invalid payment method'})
+        if not payment_method or payment_method not in VALID_PAYMENT_METHODS:
+            return json_response({'success': False, 'error': 'Invalid payment method'})
         
         member = None
         if member_id:
             try:
                 member_id = int(member_id)
             except (ValueError, TypeError):
-                return JsonResponse({'success': False, 'error': 'Invalid member ID'})
+                return json_response({'success': False, 'error': 'Invalid member ID'})
             
             session_member_id = request.session.get('kiosk_member_id')
             
-            if payment_method in ['debit', 'credit']:
+            if payment_method in MEMBER_PAYMENT_METHODS:
                 if not session_member_id or session_member_id != member_id:
-                    return JsonResponse({'success': False, 'error': 'Member authentication required. Please scan RFID card again.'})
+                    return json_response({'success': False, 'error': 'Member authentication required. Please scan RFID card again.'})
             
             try:
-                member = Member.objects.get(id=member_id, is_active=True)
+                member = Member.objects.select_related('member_type').get(id=member_id, is_active=True)
             except Member.DoesNotExist:
-                return JsonResponse({'success': False, 'error': 'Member not found or inactive'})
+                return json_response({'success': False, 'error': 'Member not found or inactive'})
             # For debit/credit payments require PIN validation (unless member is cashier/admin)
-            if payment_method in ['debit', 'credit']:
+            if payment_method in MEMBER_PAYMENT_METHODS:
                 is_cashier = member.role in ['cashier', 'admin']
                 if not is_cashier:
                     pin = data.get('pin')
                     if not pin:
-                        return JsonResponse({'success': False, 'error': 'PIN is required for member payments'})
+                        return json_response({'success': False, 'error': 'PIN is required for member payments'})
                     if not member.check_pin(pin):
-                        return JsonResponse({'success': False, 'error': 'Invalid PIN'})
+                        return json_response({'success': False, 'error': 'Invalid PIN'})
                 # Cashiers and admins can proceed without PIN (direct access)
         else:
-            if payment_method in ['debit', 'credit']:
-                return JsonResponse({'success': False, 'error': 'Member required for debit/credit payment'})
+            if payment_method in MEMBER_PAYMENT_METHODS:
+                return json_response({'success': False, 'error': 'Member required for debit/credit payment'})
             # For cash transactions, if user is logged in, try to associate with their member account
             elif payment_method == 'cash' and request.user.is_authenticated:
                 try:
                     # Try to get the member associated with the logged-in user
-                    member = Member.objects.get(user=request.user, is_active=True)
+                    # (Member.user is one-to-one, so at most one row can match)
+                    # member_type is read by calculate_patronage(); fetch it in the same query
+                    member = Member.objects.select_related('member_type').get(user=request.user, is_active=True)
                 except Member.DoesNotExist:
                     # User doesn't have a member account, that's okay for cash transactions
                     pass
-                except Member.MultipleObjectsReturned:
-                    # Multiple members found, use the first one
-                    member = Member.objects.filter(user=request.user, is_active=True).first()
         
         # Validate item data and lock involved product rows to prevent race conditions
-        product_ids = []
+        # Total quantity per product, so repeated cart lines are checked against stock together
+        wanted_quantities = {}
         for item_data in items:
             if 'product_id' not in item_data or 'quantity' not in item_data:
-                return JsonResponse({'success': False, 'error': 'Invalid item data'})
+                return json_response({'success': False, 'error': 'Invalid item data'})
             try:
                 quantity = int(item_data['quantity'])
                 if quantity <= 0:
-                    return JsonResponse({'success': False, 'error': 'Quantity must be a positive number'})
+                    return json_response({'success': False, 'error': 'Quantity must be a positive number'})
                 if quantity > 1000:
-                    return JsonResponse({'success': False, 'error': 'Quantity exceeds maximum allowed (1000)'})
+                    return json_response({'success': False, 'error': 'Quantity exceeds maximum allowed (1000)'})
                 item_data['quantity'] = quantity
             except (ValueError, TypeError):
-                return JsonResponse({'success': False, 'error': 'Invalid quantity value'})
-            product_ids.append(item_data['product_id'])
+                return json_response({'success': False, 'error': 'Invalid quantity value'})
+            # Cast once so the IN list holds distinct integers and map lookups match
+            try:
+                item_data['product_id'] = int(item_data['product_id'])
+            except (ValueError, TypeError):
+                return json_response({'success': False, 'error': 'Invalid product id'})
+            pid = item_data['product_id']
+            wanted_quantities[pid] = wanted_quantities.get(pid, 0) + quantity
 
         # Lock product rows so stock checks and reductions are consistent under concurrency
-        products_qs = Product.objects.select_for_update().filter(id__in=product_ids, is_active=True)
-        product_map = {p.id: p for p in products_qs}
+        products_qs = Product.objects.select_for_update().filter(
+            id__in=wanted_quantities, is_active=True
+        ).only('id', 'name', 'barcode', 'price', 'stock_quantity')
+        product_map = products_qs.in_bulk()
 
-        # Ensure all requested products exist and have sufficient stock
-        for item_data in items:
-            pid = item_data['product_id']
+        # Ensure all requested products exist and have sufficient stock before any writes
+        for pid, quantity in wanted_quantities.items():
             product = product_map.get(pid)
             if not product:
-                return JsonResponse({'success': False, 'error': 'Invalid product'})
-            if product.stock_quantity < item_data['quantity']:
-                return JsonResponse({'success': False, 'error': f'Insufficient stock for {product.name}'})
+                return json_response({'success': False, 'error': 'Invalid product'})
+            if product.stock_quantity < quantity:
+                return json_response({'success': False, 'error': f'Insufficient stock for {product.name}'})
         
         transaction = Transaction.objects.create(
             transaction_number=generate_transaction_number(),
@@ -235,37 +355,47 @@ def process_payment(request):
             status='pending'
         )
         
+        # Build item and stock audit rows in memory, then write each table in one statement
+        now = timezone.now()
+        transaction_items = []
+        stock_transactions = []
         for item_data in items:
             pid = item_data['product_id']
-            product = product_map.get(pid) or Product.objects.get(id=pid)
+            product = product_map[pid]
+            quantity = item_data['quantity']
             # record current stock before change
             before_stock = product.stock_quantity
 
-            TransactionItem.objects.create(
+            transaction_item = TransactionItem(
                 transaction=transaction,
                 product=product,
                 product_name=product.name,
                 product_barcode=product.barcode,
                 unit_price=product.price,
-                quantity=item_data['quantity']
+                quantity=quantity
             )
+            # bulk_create() bypasses save(), which normally fills in the line totals
+            transaction_item.calculate_amounts()
+            transaction_items.append(transaction_item)
 
-            # Attempt to reduce stock on the locked product instance
-            if product.stock_quantity >= item_data['quantity']:
-                product.stock_quantity -= item_data['quantity']
-                product.save()
-                StockTransaction.objects.create(
-                    product=product,
-                    transaction_type='out',
-                    quantity=item_data['quantity'],
-                    stock_before=before_stock,
-                    stock_after=product.stock_quantity,
-                    notes=f'Sale via kiosk transaction {transaction.transaction_number}'
-                )
-            else:
-                raise Exception(f'Failed to reduce stock for {product.name}')
+            # Reduce stock on the locked product instance; the summed quantities were checked above
+            product.stock_quantity -= quantity
+            product.updated_at = now
+            stock_transactions.append(StockTransaction(
+                product=product,
+                transaction_type='out',
+                quantity=quantity,
+                stock_before=before_stock,
+                stock_after=product.stock_quantity,
+                notes=f'Sale via kiosk transaction {transaction.transaction_number}'
+            ))
+
+        TransactionItem.objects.bulk_create(transaction_items)
+        Product.objects.bulk_update(list(product_map.values()), ['stock_quantity', 'updated_at'])
+        StockTransaction.objects.bulk_create(stock_transactions)
         
-        transaction.calculate_totals()
+        # The line items were just built in memory; total them without reading them back
+        transaction.calculate_totals(transaction_items)
         transaction.calculate_patronage()
         
         # Process product fee: deduct 0.5 pesos per product from member and add to account 3247035272
@@ -277,79 +407,72 @@ def process_payment(request):
         total_products = sum(item_data['quantity'] for item_data in items)
         total_product_fee = total_products * product_fee_per_item
         
+        # Debit sales also transfer a flat fee to account 3247035272 (recorded further below)
+        transfer_amount = Decimal('0.50')
+        account_phone = '3247035272'
+        pending_transfer = Decimal('0.00')
+        if payment_method == 'debit' and member and account_phone == account_phone_product_fee:
+            pending_transfer = transfer_amount
+        transfer_credited = False
+        
+        # Balance audit rows are collected here and inserted together once the payment is settled
+        balance_transactions = []
+        # Member balance changes below are made in memory and written once as deltas from here
+        if member:
+            balance_at_start = member.balance
+            utang_at_start = member.utang_balance
+        account_member_fee = None
         if total_product_fee > 0:
             try:
-                # Find or create the account member for product fees
-                account_member_fee = Member.objects.filter(phone=account_phone_product_fee, is_active=True).first()
-                
-                if not account_member_fee:
-                    # Generate a unique RFID for the account
-                    base_rfid = f'ACCOUNT_{account_phone_product_fee}'
-                    rfid_card_number = base_rfid
-                    counter = 1
-                    while Member.objects.filter(rfid_card_number=rfid_card_number).exists():
-                        rfid_card_number = f'{base_rfid}_{counter}'
-                        counter += 1
+                # Savepoint: a failed fee credit is rolled back alone and the sale continues
+                with db_transaction.atomic():
+                    # Find or create the account member for product fees
+                    account_member_fee = get_system_account(account_phone_product_fee)
                     
-                    account_member_fee = Member.objects.create(
-                        rfid_card_number=rfid_card_number,
-                        phone=account_phone_product_fee,
-                        first_name='System',
-                        last_name='Account',
-                        role='member',
-                        is_active=True,
-                    )
-                
-                # Add the product fee to the account
-                balance_before_fee = Decimal(str(account_member_fee.balance)).quantize(Decimal('0.01'))
-                new_balance_fee = (balance_before_fee + total_product_fee).quantize(Decimal('0.01'))
-                account_member_fee.balance = new_balance_fee
-                account_member_fee.save(update_fields=['balance'])
-                
-                # Refresh from database
-                account_member_fee.refresh_from_db()
-                balance_after_fee = Decimal(str(account_member_fee.balance)).quantize(Decimal('0.01'))
+                    # Add the product fee, plus any debit transfer fee, to the account in one UPDATE
+                    balance_before_fee, _ = credit_account(account_member_fee, total_product_fee + pending_transfer)
+                transfer_credited = pending_transfer > 0
+                balance_after_fee = (balance_before_fee + total_product_fee).quantize(TWO_PLACES)
                 
                 # Record the balance transaction
-                BalanceTransaction.objects.create(
+                balance_transactions.append(BalanceTransaction(
                     member=account_member_fee,
                     transaction_type='deposit',
                     amount=total_product_fee,
                     balance_before=balance_before_fee,
                     balance_after=balance_after_fee,
                     notes=f'Product fee ({total_products} products x ₱{product_fee_per_item}) for transaction {transaction.transaction_number}'
-                )
+                ))
                 
                 # Deduct the fee from member's balance if member exists
                 if member:
-                    member_balance_before_fee = Decimal(str(member.balance)).quantize(Decimal('0.01'))
-                    member.balance = (member_balance_before_fee - total_product_fee).quantize(Decimal('0.01'))
-                    member.save(update_fields=['balance'])
+                    member_balance_before_fee = member.balance.quantize(TWO_PLACES)
+                    member.balance = (member_balance_before_fee - total_product_fee).quantize(TWO_PLACES)
                     
                     # Record deduction from member
-                    BalanceTransaction.objects.create(
+                    balance_transactions.append(BalanceTransaction(
                         member=member,
                         transaction_type='deduction',
                         amount=total_product_fee,
                         balance_before=member_balance_before_fee,
                         balance_after=member.balance,
                         notes=f'Product fee ({total_products} products x ₱{product_fee_per_item}) for transaction {transaction.transaction_number}'
-                    )
+                    ))
                 
-                # Terminal output
-                print(f"[PRODUCT FEE] ₱{total_product_fee} ({total_products} products x ₱{product_fee_per_item})")
-                print(f"  Added to account: {account_phone_product_fee}")
-                print(f"  Account Balance: ₱{balance_before_fee} -> ₱{balance_after_fee}")
+                # Terminal output (queued; see kiosk.log_queue)
+                logger.info(
+                    f'[PRODUCT FEE] ₱{total_product_fee} ({total_products} products x ₱{product_fee_per_item}) '
+                    f'added to account {account_phone_product_fee}: ₱{balance_before_fee} -> ₱{balance_after_fee}'
+                )
                 if member:
-                    print(f"  Deducted from member: {member.full_name}")
-                    print(f"  Member Balance: ₱{member_balance_before_fee} -> ₱{member.balance}")
+                    logger.info(
+                        f'[PRODUCT FEE] Deducted from member {member.full_name}: '
+                        f'₱{member_balance_before_fee} -> ₱{member.balance}'
+                    )
                 
             except Exception as e:
                 # Log error but don't fail the main transaction
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f'Failed to process product fee for account {account_phone_product_fee}: {str(e)}')
-                print(f"[PRODUCT FEE FAILED] Error processing fee: {str(e)}")
+                logger.error(f'[PRODUCT FEE FAILED] Failed to process product fee for account {account_phone_product_fee}: {str(e)}')
         
         # Capture member balances before any changes for transparency in the response
         member_before_balance = None
@@ -359,87 +482,61 @@ def process_payment(request):
             member_before_utang = getattr(member, 'utang_balance', None)
 
         if payment_method == 'debit' and member:
+            # Balance and utang changes are applied in memory and saved once below
             if member.balance >= transaction.total_amount:
-                member.deduct_balance(transaction.total_amount)
+                member.balance -= transaction.total_amount
                 transaction.amount_from_balance = transaction.total_amount
                 transaction.status = 'completed'
             else:
                 amount_from_balance = member.balance
-                member.deduct_balance(amount_from_balance)
+                member.balance -= amount_from_balance
                 transaction.amount_from_balance = amount_from_balance
                 
                 amount_to_utang = transaction.total_amount - amount_from_balance
-                member.add_utang(amount_to_utang)
+                member.utang_balance += amount_to_utang
                 transaction.amount_to_utang = amount_to_utang
                 transaction.payment_method = 'credit'
                 transaction.status = 'completed'
             
             # Transfer 0.5 pesos to account 3247035272 for each debit transaction
-            transfer_amount = Decimal('0.50')
-            account_phone = '3247035272'
             try:
-                # Find the account member by phone number
-                account_member = Member.objects.filter(phone=account_phone, is_active=True).first()
-                
-                # If not found, create a new account member
-                if not account_member:
-                    # Generate a unique RFID for the account
-                    base_rfid = f'ACCOUNT_{account_phone}'
-                    rfid_card_number = base_rfid
-                    counter = 1
-                    while Member.objects.filter(rfid_card_number=rfid_card_number).exists():
-                        rfid_card_number = f'{base_rfid}_{counter}'
-                        counter += 1
-                    
-                    account_member = Member.objects.create(
-                        rfid_card_number=rfid_card_number,
-                        phone=account_phone,
-                        first_name='System',
-                        last_name='Account',
-                        role='member',
-                        is_active=True,
-                    )
-                
-                # Add the transfer amount to the account
-                balance_before = Decimal(str(account_member.balance)).quantize(Decimal('0.01'))
-                # Add the amount to the balance
-                new_balance = (balance_before + transfer_amount).quantize(Decimal('0.01'))
-                account_member.balance = new_balance
-                account_member.save(update_fields=['balance'])
-                
-                # Refresh from database to get the actual saved value
-                account_member.refresh_from_db()
-                balance_after = Decimal(str(account_member.balance)).quantize(Decimal('0.01'))
+                if transfer_credited:
+                    # Already added together with the product fee; only record it here
+                    account_member = account_member_fee
+                    balance_before = balance_after_fee
+                    balance_after = (balance_before + transfer_amount).quantize(TWO_PLACES)
+                else:
+                    # Savepoint, as for the product fee above
+                    with db_transaction.atomic():
+                        account_member = get_system_account(account_phone)
+                        balance_before, balance_after = credit_account(account_member, transfer_amount)
                 
                 # Record the balance transaction
-                BalanceTransaction.objects.create(
+                balance_transactions.append(BalanceTransaction(
                     member=account_member,
                     transaction_type='deposit',
                     amount=transfer_amount,
                     balance_before=balance_before,
                     balance_after=balance_after,
                     notes=f'Debit transaction fee for transaction {transaction.transaction_number}'
-                )
+                ))
                 
                 # Terminal output: Transfer successful
-                print(f"[TRANSFER SUCCESS] ₱{transfer_amount} added to account {account_phone}")
-                print(f"  Transaction: {transaction.transaction_number}")
-                print(f"  Account Balance: ₱{balance_before} -> ₱{balance_after}")
-                print(f"  Account Member ID: {account_member.id}, RFID: {account_member.rfid_card_number}")
+                logger.info(
+                    f'[TRANSFER SUCCESS] ₱{transfer_amount} added to account {account_phone} '
+                    f'(member {account_member.id}, RFID {account_member.rfid_card_number}) '
+                    f'for {transaction.transaction_number}: ₱{balance_before} -> ₱{balance_after}'
+                )
                 
             except Exception as e:
                 # Log error but don't fail the main transaction
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f'Failed to process transfer for account {account_phone}: {str(e)}')
-                
-                # Terminal output: Transfer failed
-                print(f"[TRANSFER FAILED] Failed to add ₱{transfer_amount} to account {account_phone}")
-                print(f"  Transaction: {transaction.transaction_number}")
-                print(f"  Error: {str(e)}")
+                logger.error(
+                    f'[TRANSFER FAILED] Failed to add ₱{transfer_amount} to account {account_phone} '
+                    f'for {transaction.transaction_number}: {str(e)}'
+                )
         
         elif payment_method == 'credit' and member:
-            member.add_utang(transaction.total_amount)
+            member.utang_balance += transaction.total_amount
             transaction.amount_to_utang = transaction.total_amount
             transaction.status = 'completed'
         
@@ -450,26 +547,42 @@ def process_payment(request):
                 try:
                     cash_amount = Decimal(str(cash_amount))
                     if cash_amount < transaction.total_amount:
-                        return JsonResponse({
+                        # Undo the stock and fee writes above; the sale did not happen
+                        db_transaction.set_rollback(True)
+                        return json_response({
                             'success': False, 
                             'error': f'Insufficient cash. Total: ₱{transaction.total_amount}, Received: ₱{cash_amount}'
                         })
                     transaction.amount_paid = cash_amount
                 except (ValueError, TypeError):
-                    return JsonResponse({'success': False, 'error': 'Invalid cash amount'})
+                    db_transaction.set_rollback(True)
+                    return json_response({'success': False, 'error': 'Invalid cash amount'})
             else:
                 # If no cash_amount provided, assume exact payment
                 transaction.amount_paid = transaction.total_amount
             transaction.status = 'completed'
         
+        BalanceTransaction.objects.bulk_create(balance_transactions)
+        
         transaction.save()
         
+        # One UPDATE for the fee, balance and utang changes and the last-transaction stamp.
+        # Applied as F() deltas so a concurrent write to the same member is not overwritten.
         if member:
             member.last_transaction = timezone.now()
-            member.save()
-        
-        request.session.pop('kiosk_member_id', None)
-        request.session.pop('kiosk_member_rfid', None)
+            Member.objects.filter(pk=member.pk).update(
+                balance=F('balance') + (member.balance - balance_at_start),
+                utang_balance=F('utang_balance') + (member.utang_balance - utang_at_start),
+                last_transaction=member.last_transaction,
+                updated_at=member.last_transaction,
+            )
+
+        # Session cleanup waits for the commit so it stays out of the product locks
+        def finish_checkout():
+            request.session.pop('kiosk_member_id', None)
+            request.session.pop('kiosk_member_rfid', None)
+
+        db_transaction.on_commit(finish_checkout)
         
         # Prepare member summary for response
         member_summary = None
@@ -490,7 +603,7 @@ def process_payment(request):
         if payment_method == 'cash' and transaction.amount_paid > transaction.total_amount:
             change_amount = transaction.amount_paid - transaction.total_amount
 
-        return JsonResponse({
+        return json_response({
             'success': True,
             'transaction': {
                 'id': transaction.id,
@@ -507,7 +620,7 @@ def process_payment(request):
                         'total_price': str(ti.total_price),
                         'vat_amount': str(ti.vat_amount),
                         'vatable_sale': str(ti.vatable_sale),
-                    } for ti in transaction.items.all()
+                    } for ti in transaction_items
                 ],
                 'total_amount': str(transaction.total_amount),
                 'amount_to_utang': str(transaction.amount_to_utang),
@@ -521,11 +634,128 @@ def process_payment(request):
         })
     
     except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+        return json_response({'success': False, 'error': 'Invalid JSON data'})
     except Product.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Product not found'})
+        return json_response({'success': False, 'error': 'Product not found'})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': f'Transaction failed: {str(e)}'})
+        # The error is answered rather than raised, so undo the stock and member writes
+        db_transaction.set_rollback(True)
+        logger.error(f'[CHECKOUT FAILED] {str(e)}', exc_info=True)
+        return json_response({'success': False, 'error': f'Transaction failed: {str(e)}'})
+
+
+# Seconds a temporary HTML receipt is kept so the print handler can still read it
+HTML_RECEIPT_CLEANUP_DELAY = 6
+# Bounded pool for deleting temporary receipts; bursts queue instead of spawning threads
+_receipt_cleanup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='receipt-cleanup')
+
+
+def _remove_file_later(path, delay=HTML_RECEIPT_CLEANUP_DELAY):
+    """Delete a temporary receipt file once the printer has had time to open it"""
+    time.sleep(delay)
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# Receipt markup patterns used to pull printable text out of an HTML receipt
+RECEIPT_PAPER_RE = re.compile(
+    r'<div[^>]*(?:id|class)=["\'][^"\']*receiptPaper[^"\']*["\'][^>]*>(.*?)</div>\s*(?:</div>|</body>)',
+    re.DOTALL | re.IGNORECASE
+)
+RECEIPT_BODY_RE = re.compile(r'<body[^>]*>(.*?)</body>', re.DOTALL | re.IGNORECASE)
+
+
+# Extract text from HTML, preserving structure and formatting
+class ReceiptTextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.current_line_parts = []
+
+    def _end_line(self):
+        # Parts are stripped and non-empty, so every joined line is too
+        if self.current_line_parts:
+            self.lines.append(' '.join(self.current_line_parts))
+            self.current_line_parts.clear()
+
+    def handle_data(self, data):
+        data = data.strip()
+        if data:
+            self.current_line_parts.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        # Section titles should be on their own line
+        if tag == 'br':
+            self._end_line()
+        else:
+            for name, value in attrs:
+                if name == 'class' and value and 'rp-section-title' in value:
+                    self._end_line()
+                    break
+
+    def handle_endtag(self, tag):
+        if tag in ('div', 'li', 'p', 'ul'):
+            self._end_line()
+
+    def get_text(self):
+        self._end_line()
+        return '\r\n'.join(self.lines)
+
+
+# Seconds extracted receipt text stays cached; reprints of the same receipt skip the parse
+RECEIPT_TEXT_CACHE_TIMEOUT = 3600
+
+
+def extract_receipt_text(receipt_content):
+    """Printable text for an HTML receipt fragment, cached by a hash of the markup"""
+    digest = hashlib.blake2b(receipt_content.encode('utf-8'), digest_size=16).hexdigest()
+    cache_key = f'rcpt:{digest}'
+    extracted_text = cache.get(cache_key)
+    if extracted_text is None:
+        parser = ReceiptTextExtractor()
+        parser.feed(receipt_content)
+        extracted_text = parser.get_text()
+        cache.set(cache_key, extracted_text, RECEIPT_TEXT_CACHE_TIMEOUT)
+    return extracted_text
+
+
+try:
+    import win32print
+except ImportError:
+    # pywin32 is only installed on the Windows kiosk host
+    win32print = None
+
+# Default printer name and open handle, reused across receipts; guarded by _printer_lock
+_printer_lock = threading.Lock()
+_printer = {'name': None, 'handle': None}
+
+
+def _default_printer_name():
+    """Default Windows printer name, looked up once and then cached"""
+    if _printer['name'] is None:
+        _printer['name'] = win32print.GetDefaultPrinter()
+    return _printer['name']
+
+
+def _open_printer(printer_name):
+    """Return the cached printer handle, opening it on first use"""
+    if _printer['handle'] is None:
+        _printer['handle'] = win32print.OpenPrinter(printer_name)
+    return _printer['handle']
+
+
+def _reset_printer():
+    """Close and forget the cached printer after a failure"""
+    handle = _printer['handle']
+    _printer['name'] = None
+    _printer['handle'] = None
+    if handle is not None:
+        try:
+            win32print.ClosePrinter(handle)
+        except Exception:
+            pass
 
 
 @csrf_exempt
@@ -533,22 +763,29 @@ def process_payment(request):
 def print_receipt_local(request):
     """
     POST endpoint to print receipts on the server's default Windows printer.
-    Expects JSON: { "text": "...receipt text..." } or { "html": "...", "text": "..." }
+    Expects JSON: { "text": "...receipt text..." } or { "html": "...", "text": "..." },
+    or a text/plain body holding the UTF-8 receipt text, which is sent to the printer as-is.
     If HTML is provided, prints the HTML directly to match the exact same template as manual printing.
     This endpoint attempts to use pywin32 (win32api) or webbrowser. If these are not available or
     printing fails, it returns success: false with an error message.
     """
     try:
-        data = json.loads(request.body)
-        text = data.get('text', '')
-        html = data.get('html', '')
+        raw_text = None
+        if request.content_type == 'text/plain':
+            # The body is already the receipt bytes; skip the JSON parse and re-encode
+            raw_text = request.body
+            text = ''
+            html = ''
+        else:
+            data = parse_json_body(request.body)
+            text = data.get('text', '')
+            html = data.get('html', '')
         
         # If HTML is provided, try to print it directly using the template formatting
         # This ensures the refund_receipt.html template is used with proper CSS styling
         if html:
             try:
                 import tempfile
-                import os
                 import subprocess
                 import webbrowser
                 
@@ -561,31 +798,19 @@ def print_receipt_local(request):
                     # Try to print using Windows default browser/print handler
                     # This preserves the CSS formatting from refund_receipt.html
                     os.startfile(temp_file, 'print')
-                    # Give it a moment to start printing
-                    import time
-                    time.sleep(1)
-                    return JsonResponse({'success': True, 'message': 'Receipt sent to printer using HTML template'})
+                    return json_response({'success': True, 'message': 'Receipt sent to printer using HTML template'})
                 except Exception as e:
                     # Fallback: try using webbrowser
                     try:
                         webbrowser.open(temp_file)
-                        import time
-                        time.sleep(1)
-                        return JsonResponse({'success': True, 'message': 'Receipt opened in browser for printing'})
+                        return json_response({'success': True, 'message': 'Receipt opened in browser for printing'})
                     except Exception as e2:
                         # If HTML printing fails, fall through to text extraction
                         pass
                 finally:
-                    # Clean up temp file after a delay (give print time to start)
-                    import threading
-                    def cleanup():
-                        import time
-                        time.sleep(5)
-                        try:
-                            os.unlink(temp_file)
-                        except:
-                            pass
-                    threading.Thread(target=cleanup, daemon=True).start()
+                    # Clean up temp file after a delay (give print time to start) on the
+                    # bounded cleanup pool, so the request thread returns immediately
+                    _receipt_cleanup_executor.submit(_remove_file_later, temp_file)
             except Exception as e:
                 # If HTML printing fails, fall through to text extraction
                 pass
@@ -594,162 +819,114 @@ def print_receipt_local(request):
         # Only extract from HTML if text is not provided
         if not text and html:
             try:
-                from html.parser import HTMLParser
-                import re
-                
                 # Extract the receiptPaper element content - this is the same element used in manual print
                 # Look for the receiptPaper div (by id or class) in the HTML
-                receipt_paper_match = re.search(
-                    r'<div[^>]*(?:id|class)=["\'][^"\']*receiptPaper[^"\']*["\'][^>]*>(.*?)</div>\s*(?:</div>|</body>)', 
-                    html, 
-                    re.DOTALL | re.IGNORECASE
-                )
+                receipt_paper_match = RECEIPT_PAPER_RE.search(html)
                 
                 if receipt_paper_match:
                     receipt_content = receipt_paper_match.group(1)
                 else:
                     # Fallback: extract from body if receiptPaper not found
-                    body_match = re.search(r'<body[^>]*>(.*?)</body>', html, re.DOTALL | re.IGNORECASE)
+                    body_match = RECEIPT_BODY_RE.search(html)
                     if body_match:
                         receipt_content = body_match.group(1)
                     else:
                         receipt_content = html
                 
-                # Extract text from HTML, preserving structure and formatting
-                class ReceiptTextExtractor(HTMLParser):
-                    def __init__(self):
-                        super().__init__()
-                        self.lines = []
-                        self.current_line_parts = []
-                        
-                    def handle_data(self, data):
-                        data = data.strip()
-                        if data:
-                            self.current_line_parts.append(data)
-                            
-                    def handle_starttag(self, tag, attrs):
-                        attrs_dict = dict(attrs)
-                        class_attr = attrs_dict.get('class', '')
-                        # Section titles should be on their own line
-                        if 'rp-section-title' in class_attr:
-                            if self.current_line_parts:
-                                self.lines.append(' '.join(self.current_line_parts))
-                                self.current_line_parts = []
-                        elif tag == 'br':
-                            if self.current_line_parts:
-                                self.lines.append(' '.join(self.current_line_parts))
-                                self.current_line_parts = []
-                                
-                    def handle_endtag(self, tag):
-                        if tag in ['div', 'li', 'p']:
-                            if self.current_line_parts:
-                                self.lines.append(' '.join(self.current_line_parts))
-                                self.current_line_parts = []
-                        elif tag == 'ul':
-                            if self.current_line_parts:
-                                self.lines.append(' '.join(self.current_line_parts))
-                                self.current_line_parts = []
-                                
-                    def get_text(self):
-                        if self.current_line_parts:
-                            self.lines.append(' '.join(self.current_line_parts))
-                        # Filter out empty lines and join with line breaks
-                        return '\r\n'.join([line.strip() for line in self.lines if line.strip()])
-                
-                parser = ReceiptTextExtractor()
-                parser.feed(receipt_content)
-                extracted_text = parser.get_text()
+                extracted_text = extract_receipt_text(receipt_content)
                 
                 if extracted_text and len(extracted_text) > 50:
                     text = extracted_text
                 else:
-                    return JsonResponse({
+                    return json_response({
                         'success': False, 
                         'error': 'Could not extract text content from HTML receipt template'
                     })
                     
             except Exception as e:
-                return JsonResponse({
+                return json_response({
                     'success': False, 
                     'error': f'Failed to extract text from HTML template: {str(e)}'
                 })
         
         # Fallback to text printing if HTML not available or HTML printing failed
-        if not text:
-            return JsonResponse({'success': False, 'error': 'No content available for printing'})
+        if not text and not raw_text:
+            return json_response({'success': False, 'error': 'No content available for printing'})
 
         # Text printing using win32print (for thermal printers that need raw text)
-        try:
-            import win32print
-        except ImportError:
-            return JsonResponse({
+        if win32print is None:
+            return json_response({
                 'success': False, 
                 'error': 'Printing module not available. Please install pywin32: pip install pywin32'
             })
 
         try:
-            # Get default printer
-            try:
-                printer_name = win32print.GetDefaultPrinter()
-            except Exception as e:
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'No default printer found. Please set a default printer in Windows. Error: {str(e)}'
-                })
+            # One receipt at a time: the printer handle is shared between requests
+            with _printer_lock:
+                # Get default printer
+                try:
+                    printer_name = _default_printer_name()
+                except Exception as e:
+                    return json_response({
+                        'success': False, 
+                        'error': f'No default printer found. Please set a default printer in Windows. Error: {str(e)}'
+                    })
 
-            if not printer_name:
-                return JsonResponse({
-                    'success': False, 
-                    'error': 'No default printer configured. Please set a default printer in Windows.'
-                })
+                if not printer_name:
+                    return json_response({
+                        'success': False, 
+                        'error': 'No default printer configured. Please set a default printer in Windows.'
+                    })
 
-            # Open printer
-            hPrinter = win32print.OpenPrinter(printer_name)
-            try:
-                # Start a RAW print job
-                job_info = ("KioskReceipt", None, "RAW")
-                job_id = win32print.StartDocPrinter(hPrinter, 1, job_info)
                 try:
-                    win32print.StartPagePrinter(hPrinter)
-                    # Ensure text ends with newlines for proper printing
-                    print_text = text
-                    if not print_text.endswith('\r\n'):
-                        print_text += '\r\n\r\n'
-                    # Write bytes to printer (encode as utf-8)
-                    win32print.WritePrinter(hPrinter, print_text.encode('utf-8'))
-                    win32print.EndPagePrinter(hPrinter)
-                except Exception as e:
-                    # Try to abort the job if page printing fails
+                    # Reuse the open printer; only the print job is per receipt
+                    hPrinter = _open_printer(printer_name)
+                    # Start a RAW print job
+                    job_info = ("KioskReceipt", None, "RAW")
+                    job_id = win32print.StartDocPrinter(hPrinter, 1, job_info)
                     try:
-                        win32print.AbortPrinter(hPrinter)
-                    except:
-                        pass
-                    raise e
-                finally:
-                    win32print.EndDocPrinter(hPrinter)
-            finally:
-                win32print.ClosePrinter(hPrinter)
+                        win32print.StartPagePrinter(hPrinter)
+                        # Write bytes to printer (encode as utf-8)
+                        print_bytes = raw_text if raw_text is not None else text.encode('utf-8')
+                        # Ensure text ends with newlines for proper printing
+                        if not print_bytes.endswith(b'\r\n'):
+                            print_bytes += b'\r\n\r\n'
+                        win32print.WritePrinter(hPrinter, print_bytes)
+                        win32print.EndPagePrinter(hPrinter)
+                    except Exception as e:
+                        # Try to abort the job if page printing fails
+                        try:
+                            win32print.AbortPrinter(hPrinter)
+                        except:
+                            pass
+                        raise e
+                    finally:
+                        win32print.EndDocPrinter(hPrinter)
+                except Exception:
+                    # Drop the cached printer so the next receipt looks it up and reopens it
+                    _reset_printer()
+                    raise
 
-            return JsonResponse({'success': True, 'message': f'Receipt sent to printer: {printer_name}'})
+            return json_response({'success': True, 'message': f'Receipt sent to printer: {printer_name}'})
         except Exception as e:
             error_msg = str(e)
             # Provide more helpful error messages
             if 'Access is denied' in error_msg or 'access denied' in error_msg.lower():
-                return JsonResponse({
+                return json_response({
                     'success': False, 
                     'error': 'Access denied to printer. Please check printer permissions or try running the application as administrator.'
                 })
             elif 'printer' in error_msg.lower() and 'not found' in error_msg.lower():
-                return JsonResponse({
+                return json_response({
                     'success': False, 
                     'error': 'Printer not found. Please check that the printer is connected and set as default.'
                 })
             else:
-                return JsonResponse({
+                return json_response({
                     'success': False, 
                     'error': f'Printing failed: {error_msg}'
                 })
     except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON data received'})
+        return json_response({'success': False, 'error': 'Invalid JSON data received'})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': f'Server error: {str(e)}'})
+        return json_response({'success': False, 'error': f'Server error: {str(e)}'})
@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from .models import MemberType, Member, BalanceTransaction
 from django import forms
-from django.utils.html import format_html
+from django.db.models import BooleanField, Case, Q, Value, When
+import re
+
+# A member PIN: exactly four digits
+PIN_RE = re.compile(r'\d{4}')
 
 
 class MemberPinForm(forms.ModelForm):
@@ -14,9 +18,8 @@ class MemberPinForm(forms.ModelForm):
 
     def clean_pin(self):
         pin = self.cleaned_data.get('pin')
-        if pin:
-            if not pin.isdigit() or len(pin) != 4:
-                raise forms.ValidationError('PIN must be exactly 4 digits')
+        if pin and not PIN_RE.fullmatch(pin):
+            raise forms.ValidationError('PIN must be exactly 4 digits')
         return pin
 
     def clean_user(self):
@@ -29,9 +32,11 @@ class MemberPinForm(forms.ModelForm):
             if self.instance and self.instance.pk:
                 existing_members = existing_members.exclude(pk=self.instance.pk)
             
-            if existing_members.exists():
+            # One LIMIT 1 query serves as both the existence check and the name for the message
+            existing_member = existing_members.only('first_name', 'last_name').first()
+            if existing_member:
                 raise forms.ValidationError(
-                    f'Username "{username}" is already assigned to another member: {existing_members.first().full_name}'
+                    f'Username "{username}" is already assigned to another member: {existing_member.full_name}'
                 )
         return user
 
@@ -59,28 +64,34 @@ class MemberAdmin(admin.ModelAdmin):
     list_filter = ['role', 'is_active', 'member_type']
     search_fields = ['first_name', 'last_name', 'rfid_card_number', 'email', 'user__username']
     readonly_fields = ['total_patronage', 'created_at', 'updated_at']
+    # username column reads obj.user; join it into the changelist query
+    list_select_related = ['user']
 
     def username(self, obj):
+        # Member.user is one-to-one and usernames are unique, so no other member
+        # can share this username; no per-row duplicate query is needed
         if obj.user:
-            username_value = obj.user.username
-            # Check if this username is duplicated (used by multiple members)
-            duplicate_count = Member.objects.filter(user__username=username_value).exclude(pk=obj.pk).count()
-            
-            if duplicate_count > 0:
-                # Show in red if duplicate
-                return format_html(
-                    '<span style="color: red; font-weight: bold;">{}</span>',
-                    username_value
-                )
-            return username_value
+            return obj.user.username
         return '-'
     username.short_description = 'Username'
     username.admin_order_field = 'user__username'
 
+    def get_queryset(self, request):
+        # The changelist only needs to know whether a PIN exists; compute that in SQL
+        # and leave the hash column out of the SELECT
+        return super().get_queryset(request).annotate(
+            _pin_set=Case(
+                When(Q(pin_hash__isnull=False) & ~Q(pin_hash=''), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        ).defer('pin_hash')
+
     def pin_set(self, obj):
-        return bool(obj.pin_hash)
+        return obj._pin_set
     pin_set.boolean = True
     pin_set.short_description = 'PIN set?'
+    pin_set.admin_order_field = '_pin_set'
 
 
 @admin.register(BalanceTransaction)
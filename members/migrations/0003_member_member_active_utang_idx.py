@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_member_pin_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['is_active', 'utang_balance'], name='member_active_utang_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-16 14:00
+
+from django.db import migrations
+
+
+def create_member_rfid_active_index(apps, schema_editor):
+    # Partial covering index for the RFID gate login: the active-member lookup
+    # and its user_id are answered by one index probe. INCLUDE needs PostgreSQL
+    # 11+, so other databases keep using the unique rfid_card_number index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS member_rfid_active_idx '
+        'ON members_member (rfid_card_number) '
+        'INCLUDE (user_id) '
+        'WHERE is_active'
+    )
+
+
+def drop_member_rfid_active_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS member_rfid_active_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_member_member_active_utang_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_member_rfid_active_index, drop_member_rfid_active_index),
+    ]
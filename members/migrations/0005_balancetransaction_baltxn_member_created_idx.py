@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_member_rfid_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='balancetransaction',
+            index=models.Index(fields=['member', '-created_at'], name='baltxn_member_created_idx'),
+        ),
+    ]
@@ -1,6 +1,26 @@
+import hashlib
+import hmac
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import User
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import check_password
+
+# Prefix of PIN hashes made by hash_pin(); anything else is a legacy Django password hash
+PIN_HASH_PREFIX = 'hmac_sha256$'
+
+
+def hash_pin(pin):
+    """
+    Peppered HMAC-SHA256 of a PIN, stored as 'hmac_sha256$<hex>'.
+    A 4-digit PIN has only 10,000 values, so a slow password hasher adds latency to every
+    kiosk login without protecting it; the secret pepper (kept in settings, not the
+    database) is what keeps a leaked hash from being brute-forced.
+    """
+    digest = hmac.new(settings.PIN_PEPPER.encode(), pin.encode(), hashlib.sha256).hexdigest()
+    return f'{PIN_HASH_PREFIX}{digest}'
 
 
 class MemberType(models.Model):
@@ -59,48 +79,71 @@ class Member(models.Model):
     def available_balance(self):
         return self.balance
 
+    # Balance helpers apply the change in SQL with F() so concurrent updates are not lost;
+    # the deduct/reduce variants check sufficiency in the same UPDATE
     def add_balance(self, amount):
-        self.balance += amount
-        self.save()
+        Member.objects.filter(pk=self.pk).update(balance=F('balance') + amount, updated_at=timezone.now())
+        self.refresh_from_db(fields=['balance', 'updated_at'])
 
     def deduct_balance(self, amount):
-        if self.balance >= amount:
-            self.balance -= amount
-            self.save()
-            return True
-        return False
+        updated = Member.objects.filter(pk=self.pk, balance__gte=amount).update(
+            balance=F('balance') - amount, updated_at=timezone.now()
+        )
+        if updated:
+            self.refresh_from_db(fields=['balance', 'updated_at'])
+        return bool(updated)
 
     def add_utang(self, amount):
-        self.utang_balance += amount
-        self.save()
+        Member.objects.filter(pk=self.pk).update(utang_balance=F('utang_balance') + amount, updated_at=timezone.now())
+        self.refresh_from_db(fields=['utang_balance', 'updated_at'])
 
     def set_pin(self, pin: str):
-        """Set a 4-digit PIN for the member. PIN is hashed using Django's password hasher.
+        """Set a 4-digit PIN for the member. PIN is hashed with hash_pin().
 
         Raises ValueError if PIN is not exactly 4 digits.
         """
         if not isinstance(pin, str) or not pin.isdigit() or len(pin) != 4:
             raise ValueError('PIN must be a 4-digit string')
-        self.pin_hash = make_password(pin)
-        self.save()
+        self.pin_hash = hash_pin(pin)
+        if self.pk:
+            # Existing member: write only the hash, not the whole row
+            self.save(update_fields=['pin_hash', 'updated_at'])
+        else:
+            self.save()
 
     def check_pin(self, pin: str) -> bool:
-        """Validate a candidate PIN against stored hash."""
+        """Validate a candidate PIN against stored hash.
+
+        A PIN still stored as a legacy Django password hash is rehashed with hash_pin()
+        on its first successful check, and the new hash is written to the database.
+        """
         if not self.pin_hash:
             return False
-        return check_password(pin, self.pin_hash)
+        if self.pin_hash.startswith(PIN_HASH_PREFIX):
+            return hmac.compare_digest(self.pin_hash, hash_pin(pin))
+        # PIN set before hash_pin() existed: check the Django password hash once and
+        # store the fast hash in its place
+        if not check_password(pin, self.pin_hash):
+            return False
+        self.pin_hash = hash_pin(pin)
+        Member.objects.filter(pk=self.pk).update(pin_hash=self.pin_hash)
+        return True
 
     def reduce_utang(self, amount):
-        if self.utang_balance >= amount:
-            self.utang_balance -= amount
-            self.save()
-            return True
-        return False
+        updated = Member.objects.filter(pk=self.pk, utang_balance__gte=amount).update(
+            utang_balance=F('utang_balance') - amount, updated_at=timezone.now()
+        )
+        if updated:
+            self.refresh_from_db(fields=['utang_balance', 'updated_at'])
+        return bool(updated)
 
     class Meta:
         verbose_name = "Member"
         verbose_name_plural = "Members"
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['is_active', 'utang_balance'], name='member_active_utang_idx'),
+        ]
 
 
 class BalanceTransaction(models.Model):
@@ -128,3 +171,7 @@ class BalanceTransaction(models.Model):
         verbose_name = "Balance Transaction"
         verbose_name_plural = "Balance Transactions"
         ordering = ['-created_at']
+        indexes = [
+            # Member balance history listings, newest first
+            models.Index(fields=['member', '-created_at'], name='baltxn_member_created_idx'),
+        ]
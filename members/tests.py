@@ -1,3 +1,43 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from .models import Member, PIN_HASH_PREFIX
+
+
+# A fast hasher keeps the legacy-hash fixtures cheap; check_password() reads the algorithm from the hash
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MemberPinTests(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(rfid_card_number='RFID001', first_name='Juan', last_name='Cruz')
+
+    def test_set_pin_stores_a_peppered_hash(self):
+        self.member.set_pin('1234')
+
+        self.member.refresh_from_db()
+        self.assertTrue(self.member.pin_hash.startswith(PIN_HASH_PREFIX))
+        self.assertNotIn('1234', self.member.pin_hash)
+        self.assertTrue(self.member.check_pin('1234'))
+        self.assertFalse(self.member.check_pin('4321'))
+
+    def test_legacy_hash_is_upgraded_on_first_successful_check(self):
+        Member.objects.filter(pk=self.member.pk).update(pin_hash=make_password('1234'))
+        self.member.refresh_from_db()
+
+        self.assertTrue(self.member.check_pin('1234'))
+
+        self.member.refresh_from_db()
+        self.assertTrue(self.member.pin_hash.startswith(PIN_HASH_PREFIX))
+        self.assertTrue(self.member.check_pin('1234'))
+
+    def test_legacy_hash_is_kept_after_a_wrong_pin(self):
+        legacy_hash = make_password('1234')
+        Member.objects.filter(pk=self.member.pk).update(pin_hash=legacy_hash)
+        self.member.refresh_from_db()
+
+        self.assertFalse(self.member.check_pin('0000'))
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.pin_hash, legacy_hash)
+
+    def test_member_without_pin_never_matches(self):
+        self.assertFalse(self.member.check_pin('1234'))
@@ -1,8 +1,8 @@
 from django.shortcuts import render
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import ensure_csrf_cookie
 
+from kiosk.json_codec import parse_json_body, json_response
 from .models import Member
 
 
@@ -21,21 +21,24 @@ def api_validate_rfid_login(request):
 	"""
 	import json
 	try:
-		data = json.loads(request.body)
+		data = parse_json_body(request.body)
 		rfid = data.get('rfid')
 		if not rfid:
-			return JsonResponse({'success': False, 'error': 'RFID is required'})
+			return json_response({'success': False, 'error': 'RFID is required'})
 
 		try:
-			member = Member.objects.get(rfid_card_number=rfid, is_active=True)
+			# Fetch the linked user in the same query; only the fields checked below are loaded
+			member = Member.objects.select_related('user').only(
+				'user', 'user__username', 'user__is_active'
+			).get(rfid_card_number=rfid, is_active=True)
 		except Member.DoesNotExist:
-			return JsonResponse({'success': False, 'error': 'Member not found'})
+			return json_response({'success': False, 'error': 'Member not found'})
 
 		if not member.user or not member.user.is_active:
-			return JsonResponse({'success': False, 'error': 'No active user linked to this RFID'})
+			return json_response({'success': False, 'error': 'No active user linked to this RFID'})
 
-		return JsonResponse({'success': True, 'username': member.user.username})
+		return json_response({'success': True, 'username': member.user.username})
 	except json.JSONDecodeError:
-		return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+		return json_response({'success': False, 'error': 'Invalid JSON data'})
 	except Exception as e:
-		return JsonResponse({'success': False, 'error': 'Server error occurred'})
+		return json_response({'success': False, 'error': 'Server error occurred'})
@@ -0,0 +1,31 @@
+"""
+Exception handling for the mobile API.
+Errors leave every DRF view in the {'success': False, 'error': ...} shape the
+mobile app reads, so the views need no catch-all try/except of their own.
+"""
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+logger = logging.getLogger(__name__)
+
+
+def mobile_exception_handler(exc, context):
+    """DRF exception handler that adds success/error keys and turns crashes into JSON 500s"""
+    response = exception_handler(exc, context)
+    if response is None:
+        # Not an APIException (or Http404/PermissionDenied); DRF would re-raise it
+        request = context.get('request')
+        logger.exception('Unhandled mobile API error on %s', request.path if request else '?')
+        return Response(
+            {'success': False, 'error': 'An unexpected error occurred. Please try again later.'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    if isinstance(response.data, dict):
+        detail = response.data.get('detail', response.data)
+        response.data.setdefault('success', False)
+        response.data.setdefault('error', str(detail))
+    return response
@@ -1,3 +1,49 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from members.models import Member, BalanceTransaction
+from .views import paginate_with_total
+
+
+class PaginateWithTotalTests(TestCase):
+    def setUp(self):
+        self.member = Member.objects.create(rfid_card_number='RFID001', first_name='Juan', last_name='Cruz')
+        BalanceTransaction.objects.bulk_create([
+            BalanceTransaction(
+                member=self.member, transaction_type='deposit', amount=Decimal('1.00'),
+                balance_before=Decimal(n), balance_after=Decimal(n + 1),
+            )
+            for n in range(5)
+        ])
+        self.queryset = BalanceTransaction.objects.filter(member=self.member).order_by('id')
+
+    def test_first_page_carries_the_full_count(self):
+        rows, total = paginate_with_total(self.queryset, 0, 2)
+
+        self.assertEqual([row.balance_before for row in rows], [Decimal('0.00'), Decimal('1.00')])
+        self.assertEqual(total, 5)
+
+    def test_last_partial_page_carries_the_full_count(self):
+        rows, total = paginate_with_total(self.queryset, 4, 2)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(total, 5)
+
+    def test_page_past_the_end_still_counts(self):
+        rows, total = paginate_with_total(self.queryset, 10, 2)
+
+        self.assertEqual(rows, [])
+        self.assertEqual(total, 5)
+
+    def test_filter_is_applied_before_the_count(self):
+        rows, total = paginate_with_total(self.queryset.filter(balance_before__gte=3), 0, 20)
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(total, 2)
+
+    def test_empty_queryset(self):
+        rows, total = paginate_with_total(self.queryset.none(), 0, 20)
+
+        self.assertEqual(rows, [])
+        self.assertEqual(total, 0)
@@ -7,10 +7,13 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
+from django.db.models import Count, Sum, Window
 import json
+import logging
 from datetime import timedelta
 from decimal import Decimal
 
+from kiosk.json_codec import parse_json_body
 from members.models import Member
 from transactions.models import Transaction
 from .serializers import (
@@ -18,6 +21,54 @@ from .serializers import (
     BalanceTransactionSerializer, AccountSummarySerializer
 )
 
+logger = logging.getLogger(__name__)
+
+# Largest page the listing endpoints return, whatever `limit` asks for
+MAX_PAGE_SIZE = 100
+
+
+def get_request_member(request):
+    """
+    Active member linked to the authenticated user, or None.
+    member_type is joined for MemberSerializer, and the result is kept on the
+    request so later calls in the same request do not query again.
+    """
+    if not hasattr(request, '_member'):
+        # Member.user is one-to-one, so at most one row can match
+        try:
+            request._member = Member.objects.select_related('member_type').get(user=request.user, is_active=True)
+        except Member.DoesNotExist:
+            request._member = None
+    return request._member
+
+
+def query_int(request, key, default, lo=None, hi=None):
+    """
+    Integer query parameter `key`, or `default` when it is missing or not a number.
+    The value is clamped into [lo, hi] where bounds are given.
+    """
+    try:
+        value = int(request.query_params.get(key, default))
+    except (TypeError, ValueError):
+        value = default
+    if lo is not None and value < lo:
+        value = lo
+    if hi is not None and value > hi:
+        value = hi
+    return value
+
+
+def paginate_with_total(queryset, offset, limit):
+    """
+    One page of `queryset` plus the total row count, from a single query.
+    The count is a window over the whole filtered set, evaluated before LIMIT/OFFSET.
+    """
+    rows = list(queryset.annotate(_total=Window(expression=Count('*')))[offset:offset + limit])
+    if rows:
+        return rows, rows[0]._total
+    # An empty page (past the end, or no rows at all) carries no count; ask separately
+    return rows, queryset.count()
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -30,7 +81,7 @@ def mobile_login(request):
     try:
         # Parse JSON body
         try:
-            data = json.loads(request.body)
+            data = parse_json_body(request.body)
         except json.JSONDecodeError:
             return JsonResponse(
                 {'success': False, 'error': 'Invalid JSON format'},
@@ -64,7 +115,8 @@ def mobile_login(request):
         try:
             from django.contrib.auth.models import User
             user = User.objects.get(username=username, is_active=True)
-            member = Member.objects.get(user=user, is_active=True)
+            # member_type is read by MemberSerializer; fetch it in the same query
+            member = Member.objects.select_related('member_type').get(user=user, is_active=True)
         except User.DoesNotExist:
             return JsonResponse(
                 {'success': False, 'error': 'User not found or account is inactive'},
@@ -92,7 +144,8 @@ def mobile_login(request):
         
         # Authenticate and login the user
         try:
-            login(request, member.user)
+            # Already loaded above; member.user would fetch the same row again
+            login(request, user)
         except Exception as e:
             return JsonResponse(
                 {'success': False, 'error': 'Authentication failed. Please try again.'},
@@ -110,11 +163,8 @@ def mobile_login(request):
             'session_id': request.session.session_key
         }, status=200)
         
-    except Exception as e:
-        # Log the error for debugging (in production, use proper logging)
-        import traceback
-        print(f"Mobile login error: {str(e)}")
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception('Mobile login error')
         
         return JsonResponse(
             {'success': False, 'error': 'An unexpected error occurred. Please try again later.'},
@@ -129,20 +179,12 @@ def account_info(request):
     Get current member's account information
     Requires authentication
     """
-    try:
-        member = Member.objects.get(user=request.user, is_active=True)
-    except Member.DoesNotExist:
+    member = get_request_member(request)
+    if member is None:
         return Response(
             {'success': False, 'error': 'Member account not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Member.MultipleObjectsReturned:
-        member = Member.objects.filter(user=request.user, is_active=True).first()
-        if not member:
-            return Response(
-                {'success': False, 'error': 'Member account not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
     
     serializer = MemberSerializer(member)
     return Response({
@@ -158,34 +200,27 @@ def account_summary(request):
     Get comprehensive account summary including recent transactions
     Query params: year (default current year), month (default current month, 1-12)
     """
-    try:
-        member = Member.objects.get(user=request.user, is_active=True)
-    except Member.DoesNotExist:
+    member = get_request_member(request)
+    if member is None:
         return Response(
             {'success': False, 'error': 'Member account not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Member.MultipleObjectsReturned:
-        member = Member.objects.filter(user=request.user, is_active=True).first()
-        if not member:
-            return Response(
-                {'success': False, 'error': 'Member account not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
     
-    # Get recent transactions (last 10)
+    # Get recent transactions (last 10); items are serialized too, so load them in one query
     recent_transactions = Transaction.objects.filter(
         member=member,
         status='completed'
-    ).order_by('-created_at')[:10]
+    ).prefetch_related('items').order_by('-created_at')[:10]
     
     # Get recent balance transactions (last 10)
     recent_balance_transactions = member.balance_transactions.all().order_by('-created_at')[:10]
     
     # Get month/year from query params or use current month/year
     now = timezone.now()
-    year = int(request.query_params.get('year', now.year))
-    month = int(request.query_params.get('month', now.month))
+    # The next-month boundary below must still be a valid datetime
+    year = query_int(request, 'year', now.year, lo=1, hi=9998)
+    month = query_int(request, 'month', now.month)
     
     # Validate month
     if month < 1 or month > 12:
@@ -206,8 +241,13 @@ def account_summary(request):
         created_at__lt=end_of_month
     )
     
-    total_spent_this_month = sum(t.total_amount for t in monthly_transactions)
-    total_patronage_this_month = sum(t.patronage_amount for t in monthly_transactions)
+    # Sum in the database instead of loading every transaction of the month
+    monthly_totals = monthly_transactions.aggregate(
+        spent=Sum('total_amount'),
+        patronage=Sum('patronage_amount'),
+    )
+    total_spent_this_month = monthly_totals['spent'] or Decimal('0.00')
+    total_patronage_this_month = monthly_totals['patronage'] or Decimal('0.00')
     
     data = {
         'member': MemberSerializer(member).data,
@@ -232,31 +272,25 @@ def transaction_history(request):
     Get transaction history with pagination
     Query params: page (default 1), limit (default 20)
     """
-    try:
-        member = Member.objects.get(user=request.user, is_active=True)
-    except Member.DoesNotExist:
+    member = get_request_member(request)
+    if member is None:
         return Response(
             {'success': False, 'error': 'Member account not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Member.MultipleObjectsReturned:
-        member = Member.objects.filter(user=request.user, is_active=True).first()
-        if not member:
-            return Response(
-                {'success': False, 'error': 'Member account not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
     
-    page = int(request.query_params.get('page', 1))
-    limit = int(request.query_params.get('limit', 20))
+    page = query_int(request, 'page', 1, lo=1)
+    limit = query_int(request, 'limit', 20, lo=1, hi=MAX_PAGE_SIZE)
     offset = (page - 1) * limit
     
-    transactions = Transaction.objects.filter(
-        member=member,
-        status='completed'
-    ).order_by('-created_at')[offset:offset + limit]
-    
-    total = Transaction.objects.filter(member=member, status='completed').count()
+    # Items are serialized with each transaction; load them for the whole page in one query
+    transactions, total = paginate_with_total(
+        Transaction.objects.filter(
+            member=member,
+            status='completed'
+        ).prefetch_related('items').order_by('-created_at'),
+        offset, limit
+    )
     
     serializer = TransactionSerializer(transactions, many=True)
     return Response({
@@ -279,27 +313,20 @@ def balance_transactions(request):
     Get balance transaction history (deposits, deductions, utang payments)
     Query params: page (default 1), limit (default 20)
     """
-    try:
-        member = Member.objects.get(user=request.user, is_active=True)
-    except Member.DoesNotExist:
+    member = get_request_member(request)
+    if member is None:
         return Response(
             {'success': False, 'error': 'Member account not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Member.MultipleObjectsReturned:
-        member = Member.objects.filter(user=request.user, is_active=True).first()
-        if not member:
-            return Response(
-                {'success': False, 'error': 'Member account not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
     
-    page = int(request.query_params.get('page', 1))
-    limit = int(request.query_params.get('limit', 20))
+    page = query_int(request, 'page', 1, lo=1)
+    limit = query_int(request, 'limit', 20, lo=1, hi=MAX_PAGE_SIZE)
     offset = (page - 1) * limit
     
-    balance_transactions = member.balance_transactions.all().order_by('-created_at')[offset:offset + limit]
-    total = member.balance_transactions.count()
+    balance_transactions, total = paginate_with_total(
+        member.balance_transactions.all().order_by('-created_at'), offset, limit
+    )
     
     serializer = BalanceTransactionSerializer(balance_transactions, many=True)
     return Response({
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-16 09:30
+
+from django.db import migrations
+
+
+def create_transaction_number_trgm_index(apps, schema_editor):
+    # Trigram indexes serve icontains ('%q%') lookups; PostgreSQL only.
+    # Django compiles icontains to UPPER(col::text) LIKE UPPER(...), so index that expression
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS txn_number_trgm_idx '
+        'ON transactions_transaction USING gin ((UPPER(transaction_number::text)) gin_trgm_ops)'
+    )
+
+
+def drop_transaction_number_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS txn_number_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_transaction_txn_status_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_transaction_number_trgm_index, drop_transaction_number_trgm_index),
+    ]
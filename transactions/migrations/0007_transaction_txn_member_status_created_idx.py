@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_transaction_number_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['member', 'status', '-created_at'], name='txn_member_status_created_idx'),
+        ),
+    ]
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import F, Sum
+from django.utils import timezone
 from members.models import Member
 from inventory.models import Product
 from django.conf import settings
 from decimal import Decimal
 
+# Rates are fixed for the life of the process; convert them to Decimal once at import
+VAT_RATE = Decimal(str(settings.VAT_RATE))
+DEFAULT_PATRONAGE_RATE = Decimal(str(settings.DEFAULT_PATRONAGE_RATE))
+# Currency precision
+TWO_PLACES = Decimal('0.01')
+
 
 class Transaction(models.Model):
     PAYMENT_METHODS = [
@@ -44,40 +52,65 @@ class Transaction(models.Model):
     def __str__(self):
         return f"{self.transaction_number} - {self.member.full_name if self.member else 'Guest'}"
 
-    def calculate_totals(self):
+    def calculate_totals(self, items=None):
         # Sum per-item totals and per-item VAT amounts to avoid mismatches.
-        # Sum per-item totals
-        subtotal = sum((item.total_price for item in self.items.all()), Decimal('0.00'))
-        vat_amount = sum((item.vat_amount for item in self.items.all()), Decimal('0.00'))
-        vatable_sale = sum((item.vatable_sale for item in self.items.all()), Decimal('0.00'))
+        # `items` lets a caller that already holds the line items (e.g. right after
+        # bulk_create) skip the query; prefetched items are used the same way.
+        if items is None and 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.items.all()
+        if items is not None:
+            subtotal = sum((item.total_price for item in items), Decimal('0.00'))
+            vat_amount = sum((item.vat_amount for item in items), Decimal('0.00'))
+            vatable_sale = sum((item.vatable_sale for item in items), Decimal('0.00'))
+        else:
+            # One aggregate query sums all three columns in the database
+            totals = self.items.aggregate(
+                subtotal=Sum('total_price'),
+                vat_amount=Sum('vat_amount'),
+                vatable_sale=Sum('vatable_sale'),
+            )
+            subtotal = totals['subtotal'] or Decimal('0.00')
+            vat_amount = totals['vat_amount'] or Decimal('0.00')
+            vatable_sale = totals['vatable_sale'] or Decimal('0.00')
 
         # total = vat_total + vatable_sale (per your formula)
         total_amount = vat_amount + vatable_sale
 
         # Quantize to 2 decimal places (currency)
-        self.subtotal = Decimal(subtotal).quantize(Decimal('0.01'))
-        self.vatable_sale = Decimal(vatable_sale).quantize(Decimal('0.01'))
-        self.vat_amount = Decimal(vat_amount).quantize(Decimal('0.01'))
-        self.total_amount = Decimal(total_amount).quantize(Decimal('0.01'))
-        self.save()
+        self.subtotal = Decimal(subtotal).quantize(TWO_PLACES)
+        self.vatable_sale = Decimal(vatable_sale).quantize(TWO_PLACES)
+        self.vat_amount = Decimal(vat_amount).quantize(TWO_PLACES)
+        self.total_amount = Decimal(total_amount).quantize(TWO_PLACES)
+        self.save(update_fields=['subtotal', 'vatable_sale', 'vat_amount', 'total_amount', 'updated_at'])
 
     def calculate_patronage(self):
         if self.member and self.member.member_type:
             self.patronage_rate = self.member.member_type.patronage_rate
         else:
-            self.patronage_rate = Decimal(str(settings.DEFAULT_PATRONAGE_RATE))
+            self.patronage_rate = DEFAULT_PATRONAGE_RATE
         
         self.patronage_amount = self.subtotal * self.patronage_rate
-        self.save()
+        self.save(update_fields=['patronage_rate', 'patronage_amount', 'updated_at'])
         
         if self.member:
+            # Add in SQL so a concurrent patronage update to the same member is not lost
+            Member.objects.filter(pk=self.member_id).update(
+                total_patronage=F('total_patronage') + self.patronage_amount,
+                updated_at=timezone.now(),
+            )
             self.member.total_patronage += self.patronage_amount
-            self.member.save()
 
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard aggregates filter by status and a created/updated date range
+            models.Index(fields=['status', 'created_at'], name='txn_status_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='txn_status_updated_idx'),
+            # Member history listings filter by member and status, newest first
+            models.Index(fields=['member', 'status', '-created_at'], name='txn_member_status_created_idx'),
+        ]
 
 
 class TransactionItem(models.Model):
@@ -95,21 +128,22 @@ class TransactionItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
-        # Calculate total price and VAT per line item using Decimal arithmetic
-        self.total_price = (self.unit_price * Decimal(self.quantity)).quantize(Decimal('0.01'))
+        self.calculate_amounts()
+        super().save(*args, **kwargs)
 
-        vat_rate = Decimal(str(settings.VAT_RATE))
+    def calculate_amounts(self):
+        # Calculate total price and VAT per line item using Decimal arithmetic.
+        # Called by save(); bulk_create() skips save(), so call it before bulk inserts.
+        self.total_price = (self.unit_price * Decimal(self.quantity)).quantize(TWO_PLACES)
 
         # Apply formula requested:
         # vat_total = product * vat_rate
         # vatable_sale = product - vat_total
-        vat = (self.total_price * vat_rate)
+        vat = (self.total_price * VAT_RATE)
         vatable = (self.total_price - vat)
 
-        self.vat_amount = vat.quantize(Decimal('0.01'))
-        self.vatable_sale = vatable.quantize(Decimal('0.01'))
-
-        super().save(*args, **kwargs)
+        self.vat_amount = vat.quantize(TWO_PLACES)
+        self.vatable_sale = vatable.quantize(TWO_PLACES)
 
     def __str__(self):
         return f"{self.product_name} x {self.quantity}"